@@ -0,0 +1,118 @@
+"""
+cache keeps results of the models on disk, so the same build on the same data
+is solved only once. Entries are addressed by a hash of the data and of the
+settings, written atomically and evicted from the least recently used when
+the folder grows over its size limit. Several processes could share a folder.
+"""
+import os
+import pickle
+import hashlib
+import tempfile
+import numpy as np
+
+
+class disk_cache:
+    def __init__(self, path, max_bytes=256*2**20):
+        """
+        path [str] - folder of the cache, created if missing;
+        max_bytes [int, default=256MB] - size limit of the folder,
+        least recently used entries are removed above it.
+            self.hits, self.misses - counters of self.get().
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """
+        Returns hex digest of the parts, arrays and lists of numbers are
+        hashed by their content, shape and dtype, everything else by its repr.
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, list):
+                try:
+                    array = np.asarray(part)
+                except ValueError:
+                    array = np.asarray(None)
+                part = part if array.dtype.kind in 'OUS' else array
+            if isinstance(part, np.ndarray):
+                part = np.ascontiguousarray(part)
+                digest.update(str((part.shape, part.dtype.str)).encode())
+                digest.update(part.tobytes())
+            else:
+                digest.update(repr(part).encode())
+            digest.update(b'|')
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.path, key+'.pkl')
+
+    def get(self, key):
+        # returns the stored value or None, a hit marks the entry as used
+        try:
+            with open(self._file(key), 'rb') as f:
+                value = pickle.load(f)
+            os.utime(self._file(key))
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        # writes to a temporary file, then renames it in place
+        handle, temporary = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._file(key))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        self._evict()
+
+    def _evict(self):
+        # removes least recently used entries above self.max_bytes,
+        # entries removed meanwhile by other processes are skipped
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.pkl'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, name in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def size(self):
+        # current bytes of the stored entries
+        total = 0
+        for name in os.listdir(self.path):
+            if name.endswith('.pkl'):
+                try:
+                    total += os.path.getsize(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
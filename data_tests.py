@@ -1,16 +1,156 @@
-from statsmodels.tsa.stattools import adfuller
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
 from numpy import array, diff
+from scipy.stats import norm
+from statsmodels.tsa.adfvalues import (mackinnoncrit, _tau_maxs, _tau_mins,
+                                       _tau_stars, _tau_smallps, _tau_largeps)
+try:
+    from . import kernels
+    from .cache import disk_cache
+except Exception:
+    import kernels
+    from cache import disk_cache
+
+
+class memo:
+    def __init__(self, max_entries=256, disk=None, enabled=True):
+        """
+        Remembers the results of forceSTAT / forceSTATxy by the content of
+        the data, so a series passed to many models is tested only once.
+            max_entries [int, default=256] - entries kept in memory, least
+            recently used are dropped;
+            disk [cache.disk_cache | str, default=None] - also keeps the
+            entries on disk (a folder path opens a disk_cache);
+            enabled [bool, default=True] - False always recomputes.
+            self.hits, self.misses - counters of self.get().
+        """
+        self.max_entries = max_entries
+        self.disk = disk_cache(disk) if isinstance(disk, str) else disk
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(*parts):
+        return disk_cache.key(*parts)
+
+    def get(self, key):
+        # returns the stored result or None
+        if not self.enabled:
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        value = self.disk.get(key) if self.disk is not None else None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._keep(key, value)
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        self._keep(key, value)
+        if self.disk is not None:
+            self.disk.put(key, value)
+
+    def _keep(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
 
 
 class stationarity:
+    # results of forceSTAT / forceSTATxy, shared by every model
+    memory = memo()
+
     @staticmethod
     # Augmented DF test
-    def ADF(x):
-        result = adfuller(x)
-        if result[1] < 0.05 and result[4]['5%'] > result[0]:
-            return True
-        else:
-            return False
+    def ADF(x, lags=None, max_lags=None):
+        """
+        True if x is stationary (p-value under 0.05 and statistic under the
+        5% critical value), as statsmodels adfuller with a constant and the
+        lag order selected by AIC. A 2-D x tests every row together and
+        returns array of bool; lags / max_lags as in stationarity.adf.
+        """
+        if np.ndim(x) == 1 and np.ptp(np.asarray(x, dtype=float)) == 0:
+            raise ValueError('Invalid input, x is constant')
+        result = stationarity.adf(x, lags, max_lags)
+        stat = (result['pvalue'] < 0.05) & \
+            (result['critical'][..., 1] > result['statistic'])
+        return bool(stat) if np.ndim(stat) == 0 else stat
+
+    @staticmethod
+    def adf(x, lags=None, max_lags=None):
+        """
+        Augmented Dickey-Fuller test with a constant, solved with numpy.
+            x [list/array of float] - series, or 2-D array with one series
+            per row (all rows are tested together);
+            lags [int, default=None] - fixed lag order;
+            max_lags [int, default=None] - highest order tested by AIC, by
+            default 12*(nobs/100)^(1/4) as in adfuller.
+        Every order is scored from one Cholesky factor of the largest
+        regression. Returns dict of arrays: statistic, pvalue, lags (used),
+        nobs and critical (1%, 5%, 10% MacKinnon values); constant series
+        get nan.
+        """
+        x = np.asarray(x, dtype=float)
+        single = x.ndim == 1
+        x = np.atleast_2d(x)
+        n = x.shape[1]
+        limit = n//2 - 2
+        if lags is not None:
+            max_lags = lags
+        if max_lags is None:
+            max_lags = min(limit, int(np.ceil(12.*np.power(n/100., 1/4.))))
+        if max_lags < 0 or max_lags > limit:
+            raise ValueError('maxlag must be less than (nobs/2 - 1 - ntrend)')
+        used = np.full(len(x), max_lags)
+        if lags is None:
+            used = _adf_orders(x, max_lags)
+        statistic = np.full(len(x), np.nan)
+        for order in np.unique(used):
+            rows = used == order
+            statistic[rows] = _adf_statistic(x[rows], order)
+        nobs = n-1-used
+        result = {'statistic': statistic, 'pvalue': _mackinnonp(statistic),
+                  'lags': used, 'nobs': nobs,
+                  'critical': np.array([_critical(m) for m in nobs])}
+        if single:
+            result = {key: value[0] for key, value in result.items()}
+        return result
+
+    @staticmethod
+    def orders(x, max_order=6, lags=None, max_lags=None):
+        """
+        Tests the integrations 0...max_order of x in one call, returns
+        array of bool (a column per order for 2-D x), orders too short
+        to be tested are False.
+        """
+        x = np.asarray(x, dtype=float)
+        result = np.zeros(x.shape[:-1]+(max_order+1,), dtype=bool)
+        for order in range(max_order+1):
+            try:
+                result[..., order] = stationarity.ADF(
+                    np.atleast_2d(x), lags, max_lags).reshape(x.shape[:-1])
+            except ValueError:
+                break
+            x = diff(x)
+        return result
 
     @staticmethod
     # performs simple integration
@@ -22,27 +162,52 @@ class stationarity:
     @staticmethod
     # reaches stationarity
     def forceSTAT(x, n_integrations=True):
+        x, shape = _vector(x)
+        key = stationarity.memory.key('forceSTAT', x)
+        result = stationarity.memory.get(key)
+        if result is None:
+            result = stationarity._forceSTAT(x)
+            stationarity.memory.put(key, result)
+        inte, x = result
+        if inte is None:
+            return None, x
+        # copy, so the stored data is not changed by the caller
+        x = np.copy(x).reshape(shape or x.shape)
+        return (inte, x) if n_integrations else x
+
+    @staticmethod
+    def _forceSTAT(x):
         inte = 0
-        x = array(x)
         stat = stationarity.ADF(x)
         while not stat and inte < 6:
             inte += 1
             x = stationarity.integration(x)
             stat = stationarity.ADF(x)
         else:
-            if stat and n_integrations:
+            if stat:
                 return (inte, x)
-            elif stat:
-                return x
             else:
                 return None, 'Unable to integrate X'
 
     @staticmethod
     def forceSTATxy(x, y, n_integrations=True):
+        (x, shape_x), (y, shape_y) = _vector(x), _vector(y)
+        key = stationarity.memory.key('forceSTATxy', x, y)
+        result = stationarity.memory.get(key)
+        if result is None:
+            result = stationarity._forceSTATxy(x, y)
+            stationarity.memory.put(key, result)
+        inte, x, y = result
+        if inte is None:
+            return result
+        x = np.copy(x).reshape(shape_x or x.shape)
+        y = np.copy(y).reshape(shape_y or y.shape)
+        return (inte, x, y) if n_integrations else (x, y)
+
+    @staticmethod
+    def _forceSTATxy(x, y):
         inte = 0
-        x = array(x)
         stat_x = stationarity.ADF(x)
-        y = array(y)
         stat_y = stationarity.ADF(y)
         while not stat_x and not stat_y and inte < 6:
             inte += 1
@@ -51,10 +216,8 @@ class stationarity:
             stat_x = stationarity.ADF(x)
             stat_y = stationarity.ADF(y)
         else:
-            if stat_x and stat_y and n_integrations:
+            if stat_x and stat_y:
                 return (inte, x, y)
-            elif stat_x and stat_y:
-                return (x, y)
             else:
                 return (None, 'Unable to integrate X or Y!', 'Unable to integrate X or Y!')
 
@@ -66,19 +229,122 @@ class stationarity:
         inte(int): number of integrations.
         x_legacy(list of float [newst:oldest]): base for the integrated list, it needs another value for every level of integration.
             If inte=1 needs one datapoint, if inte=2 it will need a scond datapoint (next value).
-        x_integrated(list of float [newst:oldest]) the integrated data.
+        x_integrated(list of float [newst:oldest]) the integrated data,
+            or 2-D array with a row per path / forecast.
+        Returns numpy array of the re-integrated data [newst:oldest],
+        one cumulative sum per integration (kernels.reintegrate).
         """
-        result = []
-        for x in x_integrated[::-1]:
-            reints = inte
-            base = []
-            data = array(x_legacy)
-            while reints > 1:
-                base.append(x_legacy[0])
-                data = diff(data)
-                reints -= 1
-            else:
-                new_x = sum(base)+x
-                x_legacy.pop()
-                x_legacy.insert(0, new_x)
-                result.insert(0, new_x)
+        return kernels.reintegrate(x_integrated,
+                                   kernels.levels(x_legacy, inte))
+
+
+def _vector(x):
+    # a (n, 1) / (1, n) series as 1-D and the shape to give it back in,
+    # other arrays are unchanged (a 2-D array is a batch of rows for ADF)
+    x = array(x)
+    if x.ndim == 2 and 1 in x.shape:
+        return x.reshape(-1), ((-1, 1) if x.shape[1] == 1 else (1, -1))
+    return x, None
+
+
+def _adf_design(x, order):
+    # centered target and [level, lagged differences] of the regression,
+    # the constant is removed by the centering
+    d = diff(x)
+    rows = d.shape[1]-order
+    y = d[:, order:]
+    X = np.stack([x[:, order:-1]] +
+                 [d[:, order-j:order-j+rows] for j in range(1, order+1)],
+                 axis=2)
+    return y - y.mean(axis=1, keepdims=True), \
+        X - X.mean(axis=1, keepdims=True)
+
+
+def _adf_orders(x, max_lags):
+    # lag orders with the lowest AIC, every order fitted on the same rows
+    y, X = _adf_design(x, max_lags)
+    try:
+        return _adf_aic(y, X)
+    except np.linalg.LinAlgError:
+        # a singular design, every row is solved alone
+        return np.array([_adf_order(y[i], X[i]) if np.ptp(x[i])
+                         else max_lags for i in range(len(x))])
+
+
+def _adf_aic(y, X):
+    # AIC of every order from one Cholesky factor of the largest design
+    rows = y.shape[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        L = np.linalg.cholesky(np.einsum('bri,brj->bij', X, X))
+        z = np.linalg.solve(L, np.einsum('bri,br->bi', X, y)[..., None])
+        ssr = (y*y).sum(axis=1, keepdims=True) - \
+            np.cumsum(z[..., 0]**2, axis=1)
+        k = np.arange(2, X.shape[2]+2)
+        aic = rows*(np.log(2*np.pi)+np.log(ssr/rows)+1) + 2*k
+    return np.argmin(np.nan_to_num(aic, nan=np.inf), axis=1)
+
+
+def _adf_order(y, X):
+    # AIC order of one row, singular designs by the pseudo-inverse and
+    # the rank of every order, as the OLS of adfuller
+    try:
+        return _adf_aic(y[None], X[None])[0]
+    except np.linalg.LinAlgError:
+        pass
+    rows, aic = len(y), []
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for order in range(X.shape[1]):
+            used = X[:, :order+1]
+            ssr = ((y - used @ (np.linalg.pinv(used) @ y))**2).sum()
+            k = np.linalg.matrix_rank(used) + 1
+            aic.append(rows*(np.log(2*np.pi)+np.log(ssr/rows)+1) + 2*k)
+    return int(np.argmin(np.nan_to_num(aic, nan=np.inf)))
+
+
+def _adf_statistic(x, order):
+    # t value of the level in the regression with the given lag order,
+    # singular designs row by row by the pseudo-inverse of the design
+    y, X = _adf_design(x, order)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        try:
+            inverse = np.linalg.inv(np.linalg.cholesky(
+                np.einsum('bri,brj->bij', X, X)))
+            inverse = np.einsum('bki,bkj->bij', inverse, inverse)
+            beta = np.einsum('bij,bj->bi', inverse,
+                             np.einsum('bri,br->bi', X, y))
+            rank = np.full(len(y), X.shape[2])
+        except np.linalg.LinAlgError:
+            pinv = np.linalg.pinv(X)
+            inverse = np.einsum('bik,bjk->bij', pinv, pinv)
+            beta = np.einsum('bij,bj->bi', pinv, y)
+            rank = np.array([np.linalg.matrix_rank(row) for row in X])
+        residual = y - np.einsum('bri,bi->br', X, beta)
+        ssr = (residual**2).sum(axis=1)
+        statistic = beta[:, 0]/np.sqrt(
+            ssr/(y.shape[1]-rank-1)*inverse[:, 0, 0])
+    # an exact fit of a deterministic series (trend, cycle) leaves only
+    # rounding in the residuals, adfuller finds it stationary
+    rounding = y.shape[1]*(1e3*np.finfo(float).eps *
+                           np.abs(x).max(axis=1))**2
+    return np.where((ssr <= rounding) & (np.ptp(x, axis=1) > 0), -np.inf,
+                    statistic)
+
+
+def _mackinnonp(statistic, regression='c'):
+    # vectorized statsmodels mackinnonp for N=1
+    statistic = np.asarray(statistic, dtype=float)
+    bounded = np.clip(statistic, _tau_mins[regression][0],
+                      _tau_maxs[regression][0])
+    small = np.polyval(_tau_smallps[regression][0][::-1], bounded)
+    large = np.polyval(_tau_largeps[regression][0][::-1], bounded)
+    p = norm.cdf(np.where(bounded <= _tau_stars[regression][0],
+                          small, large))
+    p = np.where(statistic > _tau_maxs[regression][0], 1., p)
+    p = np.where(statistic < _tau_mins[regression][0], 0., p)
+    return np.where(np.isnan(statistic), np.nan, p)
+
+
+@lru_cache(maxsize=1024)
+def _critical(nobs, regression='c'):
+    # MacKinnon 2010 critical values (1%, 5%, 10%) for nobs
+    return mackinnoncrit(N=1, regression=regression, nobs=nobs)
@@ -0,0 +1,556 @@
+"""
+kernels contains the vectorized numeric routines shared by predict and
+modules.concurrent_predict, they work on whole numpy arrays instead of
+python loops over every position.
+"""
+import numpy as np
+from scipy.stats import norm
+
+
+def rolling_means(data, windows, start=0, count=None):
+    """
+    Returns the moving averages of data for every window in one pass,
+    uses cumulative sums so the cost is O(n) regardless of the window.
+    Row x of column j is the mean of data[start+x: start+x+windows[j]].
+    Windows running past the end of data are returned as nan.
+        data [list/array of float] - the series, newest to oldest,
+        or 2-D array with one series per row (result series x rows x
+        windows);
+        windows [int | list of int] - window sizes, one column per window;
+        start [int, default=0] - offset of the first window;
+        count [int, default=None] - number of rows, by default as much as
+        the longest window allows.
+    """
+    data = _series(data)
+    n = data.shape[-1]
+    windows = np.atleast_1d(np.asarray(windows, dtype=int))
+    if count is None:
+        count = n - start - windows.max() + 1
+    count = max(int(count), 0)
+    cumulative = _cumsum(data)
+    overflow = start + count + windows.max() - (n+1)
+    if overflow > 0:
+        cumulative = np.concatenate(
+            (cumulative, np.full(data.shape[:-1]+(overflow,), np.nan)),
+            axis=-1)
+    first = start + np.arange(count).reshape(-1, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (cumulative[..., first+windows] -
+                  cumulative[..., first]) / windows
+    return result
+
+
+def _series(data):
+    # one series as 1-D, or 2-D with a series per row; (n, 1) is one series
+    data = np.asarray(data, dtype=float)
+    if data.ndim != 2 or data.shape[1] == 1:
+        return data.reshape(-1)
+    return data
+
+
+def _cumsum(values):
+    # prefix sums along the last axis, starting with 0
+    result = np.zeros(values.shape[:-1]+(values.shape[-1]+1,))
+    np.cumsum(values, axis=-1, out=result[..., 1:])
+    return result
+
+
+def _prefix(values, axis=0):
+    # prefix sums along axis, row k holds the sum of rows < k
+    values = np.moveaxis(values, axis, 0)
+    result = np.zeros((len(values)+1,)+values.shape[1:])
+    np.cumsum(values, axis=0, out=result[1:])
+    return np.moveaxis(result, 0, axis)
+
+
+def lagged_products(a, b, shifts, out=None):
+    """
+    Returns prefix sums of lagged products for every shift in one array,
+    row j column k is the sum of a[u]*b[u+shifts[j]] for u < k,
+    terms where u+shift falls outside b count as 0.
+    a, b could be 2-D with one series per row (result series x shifts x
+    len(a)+1), the loop is over the shifts only.
+    out [array, default=None] - array of the result shape to fill.
+    """
+    a, b = _series(a), _series(b)
+    n, m = a.shape[-1], b.shape[-1]
+    result = np.zeros(a.shape[:-1]+(len(shifts), n+1)) if out is None \
+        else out
+    for j, shift in enumerate(shifts):
+        # only u in [low, high) has a partner in b
+        low, high = max(0, -shift), min(n, m-shift)
+        row = result[..., j, :]
+        if high > low:
+            row[..., :low+1] = 0.
+            np.cumsum(a[..., low:high]*b[..., low+shift:high+shift],
+                      axis=-1, out=row[..., low+1:high+1])
+            row[..., high+1:] = row[..., high:high+1]
+        elif out is not None:
+            row[...] = 0.
+    return result
+
+
+_MOMENTS = ('N', 'Syy', 'Sy', 'Saa', 'Sya', 'Smm', 'Sym', 'Sam')
+
+
+def arima_shifts(lags, ar_lags=None, ma_max=None):
+    """
+    Returns the shifts of the two prefix product arrays of arima_products:
+    the AR lags, and 2-lags ... ma_max-1 (by default lags-2).
+    """
+    if ar_lags is None:
+        ar_lags = np.arange(1, lags)
+    if ma_max is None:
+        ma_max = lags-1
+    return np.asarray(ar_lags, dtype=int).reshape(-1), \
+        np.arange(2-lags, ma_max)
+
+
+def centered_cumsum(data):
+    # prefix sums of data less its mean, they keep the products small
+    y = _series(data)
+    if not y.shape[-1]:
+        return _cumsum(y)
+    return _cumsum(y - y.mean(axis=-1, keepdims=True))
+
+
+def arima_products(data, lags, ar_lags=None, ma_max=None):
+    """
+    Returns the lagged prefix products of arima_moments which depend only
+    on the AR lags and the largest MA lag (ma_max), as tuple:
+        Sya - data with data at every AR lag (lagged_products);
+        cross - data with centered_cumsum(data) at arima_shifts.
+    Computed once, they are shared by every chunk of MA lags.
+    """
+    y = _series(data)
+    ar_lags, shifts = arima_shifts(lags, ar_lags, ma_max)
+    return (lagged_products(y, y, ar_lags),
+            lagged_products(y, centered_cumsum(y), shifts))
+
+
+def arima_moments(data, lags, ma_lags=None, ar_lags=None, products=None):
+    """
+    Returns the sufficient statistics of every AR(t1)MA(t) model of the
+    ARIMA grid, t1 in range(1, lags) or in ar_lags and t in range(2, lags)
+    or in ma_lags.
+    Each model is a no intercept regression of data[x] on data[t1+x] and
+    the mean of data[1+x: t+x], fitted on the rows both factors share.
+    The cross-products of all pairs are read from prefix sums, the result
+    is a dict of arrays with shape (lags-1, lags-2), row t1-1 and column t-2
+    (or the positions of t1 in ar_lags and t in ma_lags):
+        N - used rows, y - target, a - AR factor, m - MA factor,
+        keys as Syy, Sya ... are the sums of the products;
+        AR_lags, MA_lags - the lags of the rows and columns.
+    products [tuple, default=None] - arima_products of the same data, lags
+    and ar_lags with ma_max at least the largest MA lag, by default
+    computed here.
+    A 2-D data with one series per row (of the same length) solves the
+    moments of every series together, the arrays get a first axis of
+    series.
+    """
+    y = _series(data)
+    n = y.shape[-1]
+    batch = y.shape[:-1]
+    if ar_lags is None:
+        ar_lags = np.arange(1, lags)
+    if ma_lags is None:
+        ma_lags = np.arange(2, lags)
+    ar_lags = np.asarray(ar_lags, dtype=int).reshape(-1, 1)
+    ma_lags = np.asarray(ma_lags, dtype=int).reshape(1, -1)
+    if lags < 3 or ma_lags.size == 0 or ar_lags.size == 0:
+        empty = np.empty(batch+(ar_lags.size, ma_lags.size))
+        moments = {key: empty for key in _MOMENTS}
+        moments.update(AR_lags=ar_lags.reshape(-1),
+                       MA_lags=ma_lags.reshape(-1))
+        return moments
+    columns = np.arange(ma_lags.size).reshape(1, -1)
+    rows = n - np.maximum(ar_lags, ma_lags)
+    window = ma_lags - 1
+    if products is None:
+        products = arima_products(y, lags, ar_lags, ma_lags.max())
+    Sya, cross = products
+    # the leading ... keeps the axis of series of 2-D data
+    mean = y.mean(axis=-1)[..., None, None] if n else 0.
+    ones = _cumsum(y)
+    squares = _cumsum(y*y)
+    moments = {'N': np.broadcast_to(rows, batch+rows.shape).astype(float),
+               'Syy': squares[..., rows], 'Sy': ones[..., rows]}
+    moments['Saa'] = squares[..., ar_lags+rows] - squares[..., ar_lags]
+    moments['Sya'] = Sya[..., np.arange(ar_lags.size)[:, None], rows]
+    averages = rolling_means(y, window.reshape(-1), start=1, count=n-1)
+    moments['Smm'] = _prefix(averages*averages, -2)[..., rows, columns]
+    moments['Sym'] = _prefix(y[..., :n-1, None]*averages,
+                             -2)[..., rows, columns]
+    # sum of data[t1+x]*mean(data[1+x: t+x]) through the centered cumsum
+    first = 2-lags
+    lead = cross[..., ma_lags-ar_lags-first, ar_lags+rows] - \
+        cross[..., ma_lags-ar_lags-first, ar_lags]
+    tail = cross[..., 1-ar_lags-first, ar_lags+rows] - \
+        cross[..., 1-ar_lags-first, ar_lags]
+    moments['Sam'] = (lead-tail)/window + \
+        mean*(ones[..., ar_lags+rows]-ones[..., ar_lags])
+    moments['AR_lags'] = ar_lags.reshape(-1)
+    moments['MA_lags'] = ma_lags.reshape(-1)
+    return moments
+
+
+def add_arima_row(moments, data, lags):
+    """
+    Adds the newest observation data[0] to the moments of the grid in
+    O(number of models), data must already start with the new value.
+    """
+    y = np.asarray(data[:lags], dtype=float).reshape(-1)
+    ar_lags = moments.get('AR_lags', np.arange(1, lags))
+    ma_lags = moments.get('MA_lags', np.arange(2, lags))
+    ar = y[ar_lags].reshape(-1, 1)
+    ma = rolling_means(y, ma_lags-1, start=1, count=1)
+    moments['N'] += 1
+    moments['Syy'] += y[0]*y[0]
+    moments['Sy'] += y[0]
+    moments['Saa'] += ar*ar
+    moments['Sya'] += y[0]*ar
+    moments['Smm'] += ma*ma
+    moments['Sym'] += y[0]*ma
+    moments['Sam'] += ar*ma
+    return moments
+
+
+def solve_arima_moments(moments):
+    """
+    Solves the 2x2 normal equations of every model in moments together.
+    Returns three arrays AR, MA, score; score is the R squared of the fit.
+    """
+    Saa, Sam, Smm = moments['Saa'], moments['Sam'], moments['Smm']
+    Sya, Sym = moments['Sya'], moments['Sym']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        det = Saa*Smm - Sam*Sam
+        AR = (Smm*Sya - Sam*Sym)/det
+        MA = (Saa*Sym - Sam*Sya)/det
+        # collinear factors (AR1 with MA2) get the minimum norm solution
+        trace = Saa + Smm
+        singular = np.abs(det) <= 1e-10*trace*trace
+        AR = np.where(singular, (Saa*Sya + Sam*Sym)/trace**2, AR)
+        MA = np.where(singular, (Sam*Sya + Smm*Sym)/trace**2, MA)
+        residual = moments['Syy'] - AR*Sya - MA*Sym
+        score = 1 - residual / \
+            (moments['Syy'] - moments['Sy']**2/moments['N'])
+    return AR, MA, score
+
+
+def arima_grid(data, lags, ma_lags=None, ar_lags=None, products=None):
+    """
+    Solves every AR(t1)MA(t) model of the ARIMA grid at once,
+    returns three arrays AR, MA, score with shape (lags-1, lags-2),
+    row t1-1 and column t-2 (as in arima_moments);
+    score is the R squared of the fit.
+    """
+    return solve_arima_moments(
+        arima_moments(data, lags, ma_lags, ar_lags, products))
+
+
+def forecast(history, periods, ar_lags=None, ar_coefs=None,
+             ma_windows=None, ma_coefs=None, intercepts=0., shocks=None):
+    """
+    Forecasts many linear lag models at once into a preallocated buffer.
+    Every step of every model is
+        intercept + sum(ar_coef*x[t-ar_lag]) + sum(ma_coef*mean(x[t-w:t]))
+    where the moving averages are kept as running sums.
+        history [list/array of float] - the series, newest to oldest,
+        or 2-D array with one series per model (as rows);
+        periods [int] - number of steps to forecast;
+        ar_lags, ar_coefs [2-D array, models x factors] - AR factors;
+        ma_windows, ma_coefs [2-D array, models x factors] - MA factors;
+        intercepts [float | array of float, default=0.] - per model;
+        shocks [2-D array, default=None] - models x periods, added to
+        every step from t+1 to t+n, as simulated errors of many paths.
+    Unused factors could be padded with coefficient 0.
+    Returns array models x periods, starting from newest (t+n ... t+1).
+    """
+    history = np.asarray(history, dtype=float)
+    if history.ndim != 2 or history.shape[1] == 1:
+        history = history.reshape(1, -1)
+    ar_lags, ar_coefs = _factors(ar_lags, ar_coefs)
+    ma_windows, ma_coefs = _factors(ma_windows, ma_coefs)
+    models = max(len(ar_lags), len(ma_windows), np.size(intercepts),
+                 len(history), 0 if shocks is None else len(shocks))
+    ar_lags, ar_coefs = _pad_models(ar_lags, ar_coefs, models)
+    ma_windows, ma_coefs = _pad_models(ma_windows, ma_coefs, models)
+    intercepts = np.broadcast_to(
+        np.asarray(intercepts, dtype=float).reshape(-1), (models,))
+    depth = int(max(ar_lags.max(initial=1), ma_windows.max(initial=1)))
+    buffer = np.empty((models, depth+periods))
+    buffer[:, :depth] = history[:, :depth][:, ::-1]
+    cumulative = np.zeros((len(history), depth+1))
+    np.cumsum(history[:, :depth], axis=1, out=cumulative[:, 1:])
+    rows = np.arange(models).reshape(-1, 1)
+    sums = cumulative[rows % len(history), ma_windows]
+    weights = ma_coefs/ma_windows
+    for position in range(depth, depth+periods):
+        value = intercepts + \
+            (ar_coefs*buffer[rows, position-ar_lags]).sum(axis=1) + \
+            (weights*sums).sum(axis=1)
+        if shocks is not None:
+            value += shocks[:, position-depth]
+        buffer[:, position] = value
+        sums += value.reshape(-1, 1) - buffer[rows, position-ma_windows]
+    return buffer[:, :depth-1:-1]
+
+
+def residuals(data, ar_lags=(), ar_coefs=(), ma_windows=(), ma_coefs=(),
+              intercepts=0.):
+    """
+    Returns the one step errors of a single model of forecast on its own
+    data (newest to oldest), on the rows where every factor is available.
+    """
+    y = np.asarray(data, dtype=float).reshape(-1)
+    ar_lags = np.asarray(ar_lags, dtype=int).reshape(-1)
+    ma_windows = np.asarray(ma_windows, dtype=int).reshape(-1)
+    depth = int(max(ar_lags.max(initial=1), ma_windows.max(initial=1)))
+    count = max(len(y)-depth, 0)
+    fitted = np.full(count, float(intercepts))
+    if ar_lags.size:
+        fitted += lagged_columns(y, ar_lags)[:count] @ \
+            np.asarray(ar_coefs, dtype=float).reshape(-1)
+    if ma_windows.size:
+        fitted += rolling_means(y, ma_windows, start=1, count=count) @ \
+            np.asarray(ma_coefs, dtype=float).reshape(-1)
+    return y[:count] - fitted
+
+
+def _factors(lags, coefs):
+    # 2-D int lags and float coefficients, empty when not used
+    if lags is None:
+        return np.ones((0, 0), dtype=int), np.zeros((0, 0))
+    lags = np.atleast_2d(np.asarray(lags, dtype=int))
+    coefs = np.broadcast_to(
+        np.atleast_2d(np.asarray(coefs, dtype=float)), lags.shape)
+    return lags, coefs
+
+
+def _pad_models(lags, coefs, models):
+    # repeats a single model / fills missing factors with zero weights
+    if lags.size == 0:
+        return np.ones((models, 1), dtype=int), np.zeros((models, 1))
+    return (np.broadcast_to(lags, (models, lags.shape[1])),
+            np.broadcast_to(coefs, (models, lags.shape[1])))
+
+
+def levels(base, integrations):
+    """
+    Returns the latest value of every integration level of base
+    (newest to oldest), the levels used by reintegrate.
+    """
+    base = np.asarray(base, dtype=float).reshape(-1)[:integrations]
+    return [np.diff(base[:level+1], n=level)[0]
+            for level in range(integrations)]
+
+
+def reintegrate(forecasts, levels):
+    """
+    Undoes the integrations of forecasts with one cumulative sum per level.
+    The differences follow data_tests.stationarity.integration on data
+    newest to oldest, or d[i] = x[i+1] - x[i].
+        forecasts [array of float] - forecasts newest to oldest (t+n...t+1),
+        1-D or 2-D with one row per model/path;
+        levels [list of float] - the latest observed value of every
+        integration level, levels[0] is the latest of the initial data.
+    """
+    result = np.asarray(forecasts, dtype=float)[..., ::-1]
+    for latest in levels[::-1]:
+        result = latest - np.cumsum(result, axis=-1)
+    return result[..., ::-1]
+
+
+def arima_pairs(data, ar_lags, ma_lags, rows=None):
+    """
+    Returns the moments (as arima_moments) of the listed AR(t1)MA(t) models
+    only, one entry per pair, optionally using only the newest rows of data.
+    """
+    y = np.asarray(data, dtype=float).reshape(-1)[:rows]
+    ones = np.concatenate(([0.], np.cumsum(y)))
+    moments = {key: np.zeros(len(ar_lags)) for key in _MOMENTS}
+    for i, (p, q) in enumerate(zip(ar_lags, ma_lags)):
+        N = len(y) - max(p, q)
+        target, ar = y[:N], y[p:p+N]
+        ma = (ones[q:q+N] - ones[1:1+N])/(q-1)
+        for key, value in (('N', N), ('Syy', target @ target),
+                           ('Sy', target.sum()), ('Saa', ar @ ar),
+                           ('Sya', target @ ar), ('Smm', ma @ ma),
+                           ('Sym', target @ ma), ('Sam', ar @ ma)):
+            moments[key][i] = value
+    return moments
+
+
+def lagged_columns(data, lags):
+    """
+    Returns matrix with column j holding data[lags[j]+x] for row x,
+    rows past len(data)-lags[j] are 0.
+    """
+    data = np.asarray(data, dtype=float).reshape(-1)
+    index = np.arange(len(data)).reshape(-1, 1) + np.asarray(lags)
+    return np.where(index < len(data),
+                    data[np.clip(index, 0, len(data)-1)], 0.)
+
+
+def lag_design(y, columns, lags):
+    """
+    Returns the centered design used by the subset regressions,
+    X with columns [1, y, lag columns...] (rows past len(y)-lag are 0),
+    the mean of y and the means of the lag columns.
+    """
+    y = np.asarray(y, dtype=float).reshape(-1)
+    lags = np.asarray(lags, dtype=int)
+    n = len(y)
+    valid = np.arange(n).reshape(-1, 1) < n - lags
+    # centering keeps the Gram matrix well conditioned
+    column_means = np.where(valid, columns, 0.).sum(axis=0) / \
+        np.maximum(valid.sum(axis=0), 1)
+    y_mean = y.mean()
+    X = np.empty((n, len(lags)+2))
+    X[:, 0] = 1.
+    X[:, 1] = y - y_mean
+    X[:, 2:] = np.where(valid, columns - column_means, 0.)
+    return X, y_mean, column_means
+
+
+def subset_regressions(y, columns, lags, subsets):
+    """
+    Solves the regressions with intercept of y on many subsets of columns
+    from one Gram matrix, every subset uses the rows x < len(y)-max(lag).
+    The Gram matrix is grown row by row from the largest lag to the
+    smallest and the normal equations of all subsets sharing the same
+    largest lag are solved together.
+        y [array of float] - the target;
+        columns [2-D array] - one column per lag, rows past len(y)-lag are
+        not used;
+        lags [array of int] - ascending lag of every column;
+        subsets [2-D array of int] - column indexes of every subset (a row),
+        ascending.
+    Returns intercepts, coefs (subsets x factors) and score, the R squared.
+    """
+    subsets = np.atleast_2d(np.asarray(subsets, dtype=int))
+    X, y_mean, column_means = lag_design(y, columns, lags)
+    lags = np.asarray(lags, dtype=int)
+    n = len(X)
+    intercepts = np.full(len(subsets), np.nan)
+    coefs = np.full(subsets.shape, np.nan)
+    score = np.full(len(subsets), np.nan)
+    largest = lags[subsets[:, -1]]
+    gram, rows = np.zeros((X.shape[1],)*2), 0
+    for lag in np.unique(largest)[::-1]:
+        new_rows = n - lag
+        if new_rows > rows:
+            gram += X[rows:new_rows].T @ X[rows:new_rows]
+            rows = new_rows
+        if rows < 1:
+            continue
+        group = np.flatnonzero(largest == lag)
+        index = np.hstack((np.zeros((len(group), 1), dtype=int),
+                           subsets[group]+2))
+        A = gram[index[:, :, None], index[:, None, :]]
+        b = gram[index, 1]
+        try:
+            beta = np.linalg.solve(A, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            beta = (np.linalg.pinv(A) @ b[..., None])[..., 0]
+        coefs[group] = beta[:, 1:]
+        intercepts[group] = beta[:, 0] + y_mean - \
+            (beta[:, 1:]*column_means[subsets[group]]).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            residual = gram[1, 1] - (beta*b).sum(axis=1)
+            score[group] = 1 - residual/(gram[1, 1] - gram[0, 1]**2/rows)
+    return intercepts, coefs, score
+
+
+def acf(data, lags):
+    """
+    Returns the autocorrelation of data for lags 0...lags, computed with
+    one FFT in O(n log n).
+    """
+    x = np.asarray(data, dtype=float).reshape(-1)
+    x = x - x.mean()
+    size = 1 << int(2*len(x)-1).bit_length()
+    spectrum = np.fft.rfft(x, size)
+    result = np.fft.irfft(spectrum*np.conj(spectrum), size)[:lags+1]
+    return result/result[0] if result[0] else result
+
+
+def pacf(data, lags):
+    """
+    Returns the partial autocorrelation of data for lags 0...lags,
+    the Durbin-Levinson recursion over the FFT autocorrelation.
+    """
+    r = acf(data, lags)
+    result = np.zeros(lags+1)
+    result[0] = 1.
+    phi = np.zeros(0)
+    for k in range(1, lags+1):
+        denominator = 1 - phi @ r[1:k]
+        last = (r[k] - phi @ r[k-1:0:-1])/denominator if denominator else 0.
+        phi = np.append(phi - last*phi[::-1], last)
+        result[k] = last
+    return result
+
+
+def screen_lags(data, lags, kind='pacf', top=None, alpha=0.05):
+    """
+    Returns the lags in range(1, lags) worth testing: those with
+    (partial) autocorrelation significant at alpha, or the top ones by its
+    absolute value. If no lag is significant the strongest one is kept.
+        kind [str, default='pacf'] - 'acf' or 'pacf';
+        top [int, default=None] - keep the top lags instead;
+        alpha [float, default=0.05] - significance level.
+    """
+    x = np.asarray(data, dtype=float).reshape(-1)
+    lags = min(lags, len(x))
+    values = np.abs((pacf if kind == 'pacf' else acf)(x, lags-1)[1:])
+    if top is not None:
+        order = np.argsort(-values, kind='stable')[:top]
+        return np.sort(order)+1
+    significant = np.flatnonzero(
+        values > norm.ppf(1-alpha/2)/np.sqrt(len(x)))
+    if not len(significant) and len(values):
+        significant = np.argmax(values).reshape(1)
+    return significant+1
+
+
+def anchored_prefix(values, anchor=4096):
+    """
+    Returns the prefix sums of values (along the first axis) as a tuple
+    (blocks, local, anchor): the sum of values[:i] is
+    blocks[i//anchor] + local[i]. local restarts every anchor rows, so the
+    sums of windows keep their precision on long series.
+        anchor [int, default=4096] - rows between the anchors,
+        None keeps one plain cumulative sum.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    # no more padding than one block of the data
+    anchor = min(int(anchor or n+1), n+1)
+    count = n//anchor + 1
+    padded = np.zeros((count*anchor,)+values.shape[1:])
+    padded[:n] = values
+    padded = padded.reshape((count, anchor)+values.shape[1:])
+    local = np.zeros_like(padded)
+    np.cumsum(padded[:, :-1], axis=1, out=local[:, 1:])
+    blocks = np.zeros((count,)+values.shape[1:])
+    np.cumsum(padded.sum(axis=1)[:-1], axis=0, out=blocks[1:])
+    return blocks, local.reshape((-1,)+values.shape[1:])[:n+1], anchor
+
+
+def window_sums(prefix, starts, ends):
+    """
+    Returns the sums of values[starts[j]: ends[j]] from the
+    anchored_prefix of values, one row per window.
+    """
+    blocks, local, anchor = prefix
+    starts, ends = np.asarray(starts), np.asarray(ends)
+    if len(starts) > 1 and (np.diff(starts) == 1).all() and \
+            (np.diff(ends) == 1).all():
+        # consecutive windows, the prefix rows are read as slices
+        sums = local[ends[0]:ends[-1]+1] - local[starts[0]:starts[-1]+1]
+    else:
+        sums = local[ends] - local[starts]
+    if len(blocks) > 1:
+        sums += blocks[ends//anchor] - blocks[starts//anchor]
+    return sums
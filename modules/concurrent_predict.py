@@ -1,8 +1,98 @@
+import atexit
 import numpy as np
-from sklearn import linear_model
+from multiprocessing.shared_memory import SharedMemory
 from concurrent.futures import ProcessPoolExecutor as PPE
 from concurrent.futures import as_completed
-from modules import data_tests
+try:
+    from .. import data_tests, kernels
+    from ..registry import registry
+    from ..table import model_table
+except Exception:
+    import data_tests
+    import kernels
+    from registry import registry
+    from table import model_table
+
+
+_executor = None
+_attached = {}
+
+
+def pool(workers=None):
+    '''
+    Returns the process pool shared by all builds, it is started once
+    and kept alive, a different number of workers restarts it.
+    '''
+    global _executor
+    if _executor is not None and workers is not None and \
+            _executor._max_workers != workers:
+        shutdown()
+    if _executor is None:
+        _executor = PPE(max_workers=workers)
+    return _executor
+
+
+def shutdown():
+    # stops the shared process pool
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+atexit.register(shutdown)
+
+
+def _attach(name, size):
+    # worker side: maps the shared series once per build
+    if name not in _attached:
+        for old in list(_attached):
+            try:
+                _attached.pop(old)[0].close()
+            except BufferError:
+                pass
+        memory = SharedMemory(name=name)
+        _attached[name] = (memory, np.ndarray(
+            (size,), dtype=float, buffer=memory.buf))
+    return _attached[name][1]
+
+
+def _block_size(n, lags):
+    # floats of the shared block of a build: data, Sya and cross products
+    ar_lags, shifts = kernels.arima_shifts(lags)
+    return n + (len(ar_lags)+len(shifts))*(n+1)
+
+
+def _views(name, n, lags):
+    # worker side: data and the prefix products (kernels.arima_products)
+    # of the shared block
+    block = _attach(name, _block_size(n, lags))
+    ar_lags, shifts = kernels.arima_shifts(lags)
+    middle = n+len(ar_lags)*(n+1)
+    return (block[:n], block[n:middle].reshape(len(ar_lags), n+1),
+            block[middle:].reshape(len(shifts), n+1))
+
+
+def _fill_products(name, n, lags, first, last):
+    # worker side: rows first...last-1 of the products, Sya rows then cross
+    data, Sya, cross = _views(name, n, lags)
+    ar_lags, shifts = kernels.arima_shifts(lags)
+    split = len(ar_lags)
+    if first < split:
+        kernels.lagged_products(data, data, ar_lags[first:last],
+                                out=Sya[first:last])
+    if last > split:
+        first, last = max(first-split, 0), last-split
+        kernels.lagged_products(data, kernels.centered_cumsum(data),
+                                shifts[first:last], out=cross[first:last])
+
+
+def _solve_chunk(name, n, lags, ma_lags):
+    # worker side: all AR lags against a chunk of MA lags, only slicing
+    # the shared prefix products
+    data, Sya, cross = _views(name, n, lags)
+    return (ma_lags,) + kernels.arima_grid(data, lags, ma_lags,
+                                           products=(Sya, cross))
 
 
 class ARIMA:
@@ -25,10 +115,11 @@ class ARIMA:
         it determines how much possible lags will be tested.
         THE CALCULATION GROW EXPONENTIALLY!
 
-    Every instance of the class will be stored in list current_models
-    (call with any self.current_models)
+    Every live instance of the class is listed in current_models
+    (call with any self.current_models), a registry.registry which could
+    be limited by count / memory or disabled.
     """
-    current_models = []
+    current_models = registry()
 
     def __init__(self, data, lags=90):
         """
@@ -54,12 +145,12 @@ class ARIMA:
             prediction of the found best model.
 
         """
-        self.current_models.append(self)
         self.integrations = 0
-        self.all_models = {}
+        self.all_models = model_table()
         self.data = data
         self.lags = lags+1
         self._test_data()
+        self.current_models.append(self)
 
     def _test_data(self):
         # Private: checks stationarity by calling other module.
@@ -69,66 +160,56 @@ class ARIMA:
             self.data)
         self.data = np.array(self.data).reshape(-1, 1)
 
-    def _moving_averages(self, lag):
-        # returns np array list of moving averages base on the lag.
-        result = []
-        for x, _ in enumerate(self.data[lag:]):
-            result.append(np.mean(self.data[1+x:lag+x]))
-        return np.array(result).reshape(-1, 1)
-
-    def _equlize(self, AR, t1, MA, t):
-        # balances the lenght of imput data
-        if t > t1:
-            base = self.data[:-t]
-            AR = AR[:-(t-t1)]
-        elif t1 > t:
-            base = self.data[:-t1]
-            MA = MA[:-(t1-t)]
-        elif t1 == t:
-            base = self.data[:-t]
-        else:
-            return 'Somethin went wrong'
-        factor = np.hstack((AR, MA))
-        return base, factor
-
     def _check_all_models(self):
         # returns the best model
-        key, spec = 'model', {'R': 0}
-        for t in self.all_models.items():
-            if spec['R'] < t[1]['R']:
-                key, spec = t[0], t[1]
-        if key != 'model':
-            return {key: spec}
-
-    def _solve(self, t):
-        # possble error is to trigger 136:
-        # _check_all_models before finishing the processes
-        MA = self._moving_averages(t)
-        for t1 in range(1, self.lags):
-            AR = self.data[t1:]
-            base, factor = self._equlize(AR, t1, MA, t)
-            model = linear_model.LinearRegression(
-                fit_intercept=False).fit(factor, base)
-            regresion_values = {'R': model.score(factor, base)**2,
-                                'AR': model.coef_[0][0],
-                                'MA': model.coef_[0][1]}
-        return ('AR'+str(t1) +
-                'I'+str(self.integrations) +
-                'MA'+str(t), regresion_values)
-
-    def build(self):
+        return self.all_models.best()
+
+    def build(self, workers=None, chunk=None):
         '''
         Trigering the build function solves all models in order to
         find the best model, by score, then returns it as a result.
         Also generates self.all_models and self.best to store the information.
+
+        The data is placed once in shared memory, the workers of pool()
+        first fill the prefix products shared by all the models
+        (kernels.arima_products) next to it, split by rows, then solve
+        chunks of MA lags against all AR lags by slicing them.
+            workers: default None, number of processes (os.cpu_count()).
+            chunk: default None, MA lags per task, by default split evenly.
         '''
-        with PPE() as exe:
-            ppe = [exe.submit(self._solve, lag) for lag in range(2, self.lags)]
-        for proc in as_completed(ppe):
-            key, spec = proc.result()
-            self.all_models[key] = spec
-        del ppe
+        data = np.ascontiguousarray(self.data, dtype=float).reshape(-1)
+        n = len(data)
+        ma_lags = list(range(2, self.lags))
+        executor = pool(workers)
+        chunk = chunk or -(-len(ma_lags) // executor._max_workers)
+        ar_lags, shifts = kernels.arima_shifts(self.lags)
+        rows = len(ar_lags)+len(shifts) if ma_lags else 0
+        step = max(-(-rows // executor._max_workers), 1)
+        AR, MA, score = (np.empty((self.lags-1, len(ma_lags)))
+                         for _ in range(3))
+        memory = SharedMemory(
+            create=True, size=max(_block_size(n, self.lags)*8, 1))
+        try:
+            np.ndarray((n,), dtype=float, buffer=memory.buf)[:] = data
+            for proc in [executor.submit(_fill_products, memory.name, n,
+                                         self.lags, x, x+step)
+                         for x in range(0, rows, step)]:
+                proc.result()
+            ppe = [executor.submit(_solve_chunk, memory.name, n,
+                                   self.lags, ma_lags[x:x+chunk])
+                   for x in range(0, len(ma_lags), max(chunk, 1))]
+            for proc in as_completed(ppe):
+                lags, ar, ma, sc = proc.result()
+                columns = np.array(lags) - 2
+                AR[:, columns], MA[:, columns], score[:, columns] = \
+                    ar, ma, sc
+        finally:
+            memory.close()
+            memory.unlink()
+        self.all_models = model_table.from_grid(
+            AR, MA, score, self.integrations)
         self.best = self._check_all_models()
+        self.current_models.touch(self)
         return self.best
 
     def _decode_key(self, key):
@@ -182,22 +263,16 @@ class ARIMA:
             key = self._key_integrity(model)
             model_dict = self.all_models[key]
         AR, MA = self._decode_key(key)
-        data = AR if AR > MA else MA
-        data = AR if AR > MA else MA
-        data = self.data[:data]
-        base = self.base[:self.integrations+1]
-        for t in range(periods):
-            add = [base[0]]
-            for t in range(self.integrations):
-                add.append(np.diff(base[:t+2]))
-            result = data[AR-1]*model_dict['AR'] + \
-                np.mean(data[:MA]*model_dict['MA'])
-            data = np.insert(data, 0, result, 0)
-            base = np.insert(base, 0, result+sum(add))
-            self.prediction = {'key': key,
-                               'periods(t)': 't+n ... t+3, t+2, t+1',
-                               'prediction': data[:periods],
-                               're-integrated': base[:-(self.integrations+1)]}
+        forecast = kernels.forecast(
+            self.data, periods,
+            ar_lags=[[AR]], ar_coefs=[[model_dict['AR']]],
+            ma_windows=[[MA]], ma_coefs=[[model_dict['MA']]])[0]
+        self.prediction = {'key': key,
+                           'periods(t)': 't+n ... t+3, t+2, t+1',
+                           'prediction': forecast.reshape(-1, 1),
+                           're-integrated': kernels.reintegrate(
+                               forecast, kernels.levels(
+                                   self.base, self.integrations))}
         return self.prediction
 
     def __str__(self):
@@ -0,0 +1,150 @@
+"""
+fleet fits the ARIMA model of predict.ARIMA on many series in one call.
+Chunks of series are solved by the shared process pool of
+modules.concurrent_predict; within a chunk the stationarity tests, the
+grids and the forecasts are solved together across the series.
+"""
+import numpy as np
+from pandas import DataFrame
+try:
+    from .. import data_tests, kernels
+    from .concurrent_predict import pool
+except Exception:
+    import data_tests
+    import kernels
+    from modules.concurrent_predict import pool
+
+
+def fit(series, lags=30, periods=31, workers=None, chunk=64):
+    """
+    Integrates, builds and predicts the best ARIMA model of every series.
+        series [2-D array | DataFrame | list of lists] - one series per row
+        of the array / list, or per column of the DataFrame, every series from
+        newest to oldest, nan values (ragged ends) are dropped;
+        lags [int, default=30] - tested lags, as in predict.ARIMA;
+        periods [int, default=31] - length of the forecasts;
+        workers [int, default=None] - processes of the pool, 1 solves in
+        this process;
+        chunk [int, default=64] - series solved per task.
+    Returns DataFrame with a row per series:
+        key, integrations, AR_lag, MA_lag, AR, MA, R and forecast,
+        the re-integrated prediction (t+n ... t+1).
+    Series which could not be integrated or solved (constant, too short)
+    get a row with key None instead of stopping the call.
+    """
+    labels, series = _split(series)
+    chunks = [series[x:x+chunk] for x in range(0, len(series), chunk)]
+    if workers == 1 or len(chunks) <= 1:
+        results = [_fit_chunk(part, lags, periods) for part in chunks]
+    else:
+        executor = pool(workers)
+        results = list(executor.map(
+            _fit_chunk, chunks, [lags]*len(chunks), [periods]*len(chunks)))
+    rows = [row for part in results for row in part]
+    return DataFrame(rows, index=labels)
+
+
+def _split(series):
+    # returns labels and list of 1-D float arrays without nan
+    if isinstance(series, DataFrame):
+        labels = list(series.columns)
+        series = [series[label].to_numpy(dtype=float) for label in labels]
+    else:
+        series = [np.asarray(x, dtype=float).reshape(-1) for x in series]
+        labels = list(range(len(series)))
+    return labels, [x[~np.isnan(x)] for x in series]
+
+
+def _fit_chunk(series, lags, periods):
+    # integrates and solves the grids of the series of the chunk together
+    # (series of the same length as one batch), then forecasts the best
+    # models of the chunk together
+    lags = lags+1
+    integrated = _integrate(series)
+    rows = [{'key': None, 'integrations': integrations, 'AR_lag': np.nan,
+             'MA_lag': np.nan, 'AR': np.nan, 'MA': np.nan, 'R': np.nan,
+             'forecast': None} for integrations, _ in integrated]
+    solvable = [i for i, (integrations, data) in enumerate(integrated)
+                if integrations is not None and len(data) > lags]
+    for group in _groups(solvable, [len(integrated[i][1]) for i in solvable]):
+        n = len(integrated[group[0]][1])
+        # the prefix products of a batch hold about 3*lags rows per series
+        size = max(2**22 // (3*lags*(n+1)), 1)
+        for first in range(0, len(group), size):
+            batch = group[first:first+size]
+            AR, MA, score = kernels.arima_grid(
+                np.array([integrated[i][1] for i in batch]), lags)
+            # first best model in the order of predict.ARIMA.all_models
+            R = np.nan_to_num(score.transpose(0, 2, 1)**2, nan=-np.inf)
+            t, t1 = np.unravel_index(
+                np.argmax(R.reshape(len(batch), -1), axis=1), R.shape[1:])
+            for j, i in enumerate(batch):
+                x, integrations = series[i], integrated[i][0]
+                rows[i].update(
+                    key='AR'+str(t1[j]+1)+'I'+str(integrations) +
+                    'MA'+str(t[j]+2), AR_lag=t1[j]+1, MA_lag=t[j]+2,
+                    AR=AR[j, t1[j], t[j]], MA=MA[j, t1[j], t[j]],
+                    R=score[j, t1[j], t[j]]**2,
+                    levels=kernels.levels(x, integrations))
+    solved = [row for row in rows if row['key'] is not None]
+    if solved:
+        forecasts = kernels.forecast(
+            np.array([integrated[i][1][:lags] for i, row in enumerate(rows)
+                      if row['key'] is not None]), periods,
+            ar_lags=[[row['AR_lag']] for row in solved],
+            ar_coefs=np.reshape([row['AR'] for row in solved], (-1, 1)),
+            ma_windows=[[row['MA_lag']] for row in solved],
+            ma_coefs=np.reshape([row['MA'] for row in solved], (-1, 1)))
+        for row, forecast in zip(solved, forecasts):
+            row['forecast'] = kernels.reintegrate(forecast, row.pop('levels'))
+    return rows
+
+
+def _groups(items, lengths):
+    # items grouped by their length, in the order of the first of each
+    groups = {}
+    for item, length in zip(items, lengths):
+        groups.setdefault(length, []).append(item)
+    return list(groups.values())
+
+
+def _integrate(series):
+    """
+    Integrates every series until stationary, as
+    data_tests.stationarity.forceSTAT; series of the same length are tested
+    together (stationarity.ADF of 2-D data), every order only tests the
+    series not yet stationary. Returns list of (integrations, data),
+    (None, None) for series which could not be integrated or tested
+    (constant, too short); when a batch fails its series are tested one
+    by one, so only the failing ones are dropped.
+    """
+    result = [(None, None)]*len(series)
+    for group in _groups(range(len(series)), [len(x) for x in series]):
+        data = np.array([series[i] for i in group], dtype=float)
+        pending, x = np.arange(len(group)), data
+        for order in range(7):
+            stationary, failed = _stationary(x)
+            for i in pending[stationary]:
+                result[group[i]] = (order, np.diff(data[i], n=order))
+            keep = ~stationary & ~failed
+            pending, x = pending[keep], x[keep]
+            if not len(pending):
+                break
+            x = np.diff(x)
+    return result
+
+
+def _stationary(x):
+    # stationarity.ADF of the rows of x and the rows which could not be
+    # tested, when the batch fails every row is tested alone
+    try:
+        return data_tests.stationarity.ADF(x), np.zeros(len(x), dtype=bool)
+    except Exception:
+        pass
+    stationary, failed = np.zeros((2, len(x)), dtype=bool)
+    for j in range(len(x)):
+        try:
+            stationary[j] = data_tests.stationarity.ADF(x[j:j+1])[0]
+        except Exception:
+            failed[j] = True
+    return stationary, failed
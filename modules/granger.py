@@ -0,0 +1,116 @@
+"""
+granger tests the Granger causality (as regression.causality) of every pair
+of many series. Every series is integrated once, the restricted model of a
+target is solved once for all of its causes, and chunks of targets are
+solved by the shared process pool of modules.concurrent_predict.
+"""
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from concurrent.futures import as_completed
+try:
+    from .. import data_tests, regression
+    from .concurrent_predict import pool, _attach
+    from .fleet import _split
+except Exception:
+    import data_tests
+    import regression
+    from modules.concurrent_predict import pool, _attach
+    from modules.fleet import _split
+
+
+def matrix(series, test_lags=5, integrate=True, workers=None, chunk=16):
+    """
+    Tests the causality of every series on every other one.
+        series [2-D array | DataFrame | list of lists] - one series per row
+        of the array / list, or per column of the DataFrame, every series from
+        newest to oldest, nan values (ragged ends) are dropped;
+        test_lags [int, default=5] - lags to test for causality;
+        integrate [bool, default=True] - every series is integrated until
+        stationary on its own, then all are cut to the newest common length;
+        workers [int, default=None] - processes of the pool, 1 solves in
+        this process;
+        chunk [int, default=16] - targets solved per task.
+    Returns dict:
+        labels, lags, integrations (per series);
+        value - p-values, array lags x series x series, [lag-1, i, j] is
+        the test of series i => series j;
+        causes - value < 0.05;
+        full_model RSQ - as value;
+        used_datapoints - per lag.
+    Series which could not be integrated or tested (constant, too short)
+    get nan.
+    """
+    labels, series = _split(series)
+    integrations = [0]*len(series)
+    if integrate:
+        for i, x in enumerate(series):
+            try:
+                integrations[i], series[i] = \
+                    data_tests.stationarity.forceSTAT(x)
+            except ValueError:
+                # constant or too short to be tested
+                integrations[i] = None
+            if integrations[i] is None:
+                series[i] = np.array([])
+    valid = [i for i, x in enumerate(series) if len(x)]
+    n = min((len(series[i]) for i in valid), default=0)
+    data = np.ascontiguousarray(
+        [np.asarray(series[i], dtype=float)[:n] for i in valid]).reshape(
+            len(valid), n)
+    auto_R, full_R = _solve(data, test_lags, workers, chunk)
+    lags = np.arange(1, test_lags+1)
+    N = (n - lags).reshape(-1, 1, 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        value = regression._granger_test(
+            full_R, auto_R[:, None, :], N, lags.reshape(-1, 1, 1))
+    size = (test_lags, len(series), len(series))
+    result = {'labels': labels, 'lags': lags.tolist(),
+              'integrations': integrations,
+              'value': np.full(size, np.nan),
+              'full_model RSQ': np.full(size, np.nan),
+              'used_datapoints': (n - lags).tolist()}
+    cells = np.ix_(np.arange(test_lags), valid, valid)
+    result['value'][cells] = value
+    result['full_model RSQ'][cells] = full_R
+    result['causes'] = result['value'] < 0.05
+    return result
+
+
+def _solve(data, test_lags, workers, chunk):
+    # R squared arrays: restricted lags x target and full
+    # lags x cause x target, chunks of targets by the pool
+    count = len(data)
+    auto_R = np.full((test_lags, count), np.nan)
+    full_R = np.full((test_lags, count, count), np.nan)
+    targets = [list(range(x, min(x+chunk, count)))
+               for x in range(0, count, chunk)]
+    if workers == 1 or len(targets) <= 1:
+        for part in targets:
+            _fill(auto_R, full_R, part, _solve_targets(data, part, test_lags))
+        return auto_R, full_R
+    executor = pool(workers)
+    memory = SharedMemory(create=True, size=max(data.nbytes, 1))
+    try:
+        np.ndarray(data.shape, dtype=float, buffer=memory.buf)[:] = data
+        ppe = {executor.submit(_solve_chunk, memory.name, data.shape,
+                               part, test_lags): part for part in targets}
+        for proc in as_completed(ppe):
+            _fill(auto_R, full_R, ppe[proc], proc.result())
+    finally:
+        memory.close()
+        memory.unlink()
+    return auto_R, full_R
+
+
+def _fill(auto_R, full_R, targets, results):
+    auto_R[:, targets], full_R[:, :, targets] = results
+
+
+def _solve_chunk(name, shape, targets, test_lags):
+    # worker side: the series are mapped from the shared memory
+    data = _attach(name, shape[0]*shape[1]).reshape(shape)
+    return _solve_targets(data, targets, test_lags)
+
+
+def _solve_targets(data, targets, test_lags):
+    return regression._granger_targets(data, targets, test_lags)
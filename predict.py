@@ -1,9 +1,40 @@
 import numpy as np
+from math import comb
+from itertools import combinations
 from sklearn import linear_model
 try:
-    from . import data_tests
+    from . import data_tests, kernels, search
+    from .cache import disk_cache
+    from .registry import registry
+    from .table import model_table
 except Exception:
     import data_tests
+    import kernels
+    import search
+    from cache import disk_cache
+    from registry import registry
+    from table import model_table
+
+
+def _open_cache(cache):
+    # cache could be given as a folder path
+    if isinstance(cache, str):
+        return disk_cache(cache)
+    return cache
+
+
+def _intervals(data, levels, periods, n_paths, quantiles, seed, factors):
+    # simulates n_paths residual bootstrapped paths of one model in a
+    # single batched recursion, returns the re-integrated quantiles
+    errors = kernels.residuals(data, **factors)
+    errors = errors[np.isfinite(errors)]
+    errors = errors - errors.mean() if len(errors) else np.zeros(1)
+    shocks = np.random.default_rng(seed).choice(errors, (n_paths, periods))
+    paths = kernels.forecast(data, periods, shocks=shocks, **{
+        name: value if name == 'intercepts' else [np.reshape(value, -1)]
+        for name, value in factors.items()})
+    paths = kernels.reintegrate(paths, levels)
+    return np.quantile(paths, quantiles, axis=0)
 
 
 class ARIMA:
@@ -26,19 +57,25 @@ class ARIMA:
         it determines how much possible lags will be tested.
         THE CALCULATION GROW EXPONENTIALLY!
 
-    Every instance of the class will be stored in list current_models
-    (call with any self.current_models)
+        cache: by default None, cache.disk_cache or path to its folder,
+        stores the integration and the build results on disk, so the same
+        data is not solved twice.
+
+    Every live instance of the class is listed in current_models
+    (call with any self.current_models), a registry.registry which could
+    be limited by count / memory or disabled.
     """
-    current_models = []
+    current_models = registry()
 
-    def __init__(self, data, lags=30):
+    def __init__(self, data, lags=30, cache=None):
         """
         Constructor params(could be invoked):
         -------------------------------------
             self.integrations: automated - returns the integrations done
             to make the data stationary.
 
-            self.all_models: stores information on all models solved.
+            self.all_models: stores information on all models solved,
+            table.model_table - a dict view of a structured array.
 
             self.data: input - initial data.
 
@@ -55,73 +92,193 @@ class ARIMA:
             prediction of the found best model.
 
         """
-        self.current_models.append(self)
         self.integrations = 0
-        self.all_models = {}
+        self.all_models = model_table()
+        self.top_k = None
         self.data = data
         self.lags = lags+1
+        self.cache = _open_cache(cache)
         self._test_data()
+        # appended last, so its size is measured with the data
+        self.current_models.append(self)
 
     def _test_data(self):
         # Private: checks stationarity by calling other module.
         # Private: transform into numpy array with proper shape/bachup.
         self.base = np.copy(self.data)
+        key = None
+        if self.cache is not None:
+            key = self.cache.key('forceSTAT', self.base)
+            stored = self.cache.get(key)
+            if stored is not None:
+                self.integrations, self.data = stored
+                return
         self.integrations, self.data = data_tests.stationarity.forceSTAT(
             self.data)
         self.data = np.array(self.data).reshape(-1, 1)
-
-    def _moving_averages(self, lag):
-        # returns np array list of moving averages base on the lag.
-        result = []
-        for x, _ in enumerate(self.data[lag:]):
-            result.append(np.mean(self.data[1+x:lag+x]))
-        return np.array(result).reshape(-1, 1)
-
-    def _equlize(self, AR, t1, MA, t):
-        # balances the lenght of imput data
-        if t > t1:
-            base = self.data[:-t]
-            AR = AR[:-(t-t1)]
-        elif t1 > t:
-            base = self.data[:-t1]
-            MA = MA[:-(t1-t)]
-        elif t1 == t:
-            base = self.data[:-t]
-        else:
-            return 'Somethin went wrong'
-        factor = np.hstack((AR, MA))
-        return base, factor
+        if key is not None:
+            self.cache.put(key, (self.integrations, self.data))
 
     def _check_all_models(self):
         # returns the best model
-        key, spec = 'model', {'R': 0}
-        for t in self.all_models.items():
-            if spec['R'] < t[1]['R']:
-                key, spec = t[0], t[1]
-        if key != 'model':
-            return {key: spec}
+        return self.all_models.best()
 
-    def build(self):
+    def build(self, strategy='exhaustive', models=None, seconds=None,
+              top_k=None, screen=None, screen_top=None, **options):
         '''
         Trigering the build function solves all models in order to
         find the best model, by score, then returns it as a result.
         Also generates self.all_models and self.best to store the information.
+        All models are solved together by kernels.arima_grid.
+
+        Params:
+        -------
+            strategy: default 'exhaustive', how models are selected,
+            one of search.strategies:
+                'exhaustive' - all models,
+                'coarse_to_fine' - sparse grid refined around the best,
+                'successive_halving' - all models on the newest data, the
+                best of them on more and more data,
+                'hill_climb' - from options['seed'] to the best neighbour.
+            Only the solved models are stored in self.all_models.
+
+            models: default None, maximum number of solved models.
+
+            seconds: default None, maximum time of the search.
+            Whatever the budget, the first models (a chunk of 64 with
+            seconds) are solved on the whole data, so there is a best.
+
+            top_k: default None, keep only the top_k models by R
+            in self.all_models; the grid moments are then not kept, so
+            update builds again.
+
+            screen: default None, 'pacf' or 'acf' - tests only the lags
+            with significant (partial) autocorrelation of the integrated
+            data, AR(t1) for a lag t1 and MA(t) for a lag t-1.
+
+            screen_top: default None, with screen keeps the screen_top
+            strongest lags instead of the significant ones.
+
+            options: passed to the strategy (step, eta, min_rows, seed).
+
+        self.search stores the strategy and how many models were solved.
         '''
-        for t in range(2, self.lags):
-            MA = self._moving_averages(t)
-            for t1 in range(1, self.lags):
-                AR = self.data[t1:]
-                base, factor = self._equlize(AR, t1, MA, t)
-                model = linear_model.LinearRegression(
-                    fit_intercept=False).fit(factor, base)
-                regresion_values = {'R': model.score(factor, base)**2,
-                                    'AR': model.coef_[0][0],
-                                    'MA': model.coef_[0][1]}
-            self.all_models['AR'+str(t1) +
-                            'I'+str(self.integrations) +
-                            'MA'+str(t)
-                            ] = regresion_values
+        self._options = dict(strategy=strategy, models=models,
+                             seconds=seconds, top_k=top_k, screen=screen,
+                             screen_top=screen_top, **options)
+        self.top_k = top_k
+        self._ticks = 0
+        key = None
+        if self.cache is not None:
+            key = self.cache.key('ARIMA', self.lags, self.integrations,
+                                 tuple(sorted(self._options.items())),
+                                 self.base)
+            stored = self.cache.get(key)
+            if stored is not None:
+                (self.all_models, self.best, self.search,
+                 self._moments) = stored
+                self.current_models.touch(self)
+                return self.best
+        self._search(strategy, models, seconds, options, screen, screen_top)
+        if key is not None:
+            self.cache.put(key, (self.all_models, self.best, self.search,
+                                 self._moments))
+        self.current_models.touch(self)
+        return self.best
+
+    def _search(self, strategy, models, seconds, options, screen=None,
+                screen_top=None):
+        # solves the models asked by the strategy
+        ar_lags, ma_lags = self._screen(screen, screen_top)
+        engine = search.searcher(self.data, self.lags, models, seconds,
+                                 ar_lags, ma_lags)
+        if strategy == 'exhaustive' and models is None and seconds is None:
+            self._moments = kernels.arima_moments(
+                self.data, self.lags, engine.ma_lags, engine.ar_lags)
+            self._fill_models()
+            if self.top_k is not None:
+                # the full grid moments would outweigh the top_k models
+                self._moments = None
+            self.search = {'strategy': strategy,
+                           'evaluated': engine.candidates,
+                           'candidates': engine.candidates}
+            return
+        self._moments = None
+        search.strategies[strategy](engine, **options)
+        self.all_models = model_table(
+            [(t1, t, self.integrations, AR, MA, R)
+             for (t1, t), (AR, MA, R) in engine.results.items()],
+            self.top_k)
+        self.best = self._check_all_models()
+        self.search = {'strategy': strategy,
+                       'evaluated': engine.evaluated,
+                       'candidates': engine.candidates}
+
+    def _screen(self, screen, screen_top):
+        # AR and MA lags kept by the screen, None tests all of them
+        if screen is None:
+            return None, None
+        lags = kernels.screen_lags(self.data, self.lags, kind=screen,
+                                   top=screen_top)
+        return lags, lags[lags < self.lags-1]+1
+
+    def _fill_models(self):
+        # solves the stored moments and refreshes all_models and best
+        AR, MA, score = kernels.solve_arima_moments(self._moments)
+        self.all_models = model_table.from_grid(
+            AR, MA, score, self.integrations, self._moments.get('MA_lags'),
+            self.top_k, self._moments.get('AR_lags'))
         self.best = self._check_all_models()
+
+    def update(self, new_values, recheck=100):
+        '''
+        Update function:
+        ----------------
+        Adds new observations to a built model and refreshes self.all_models
+        and self.best without solving the grid again, every new value
+        costs one pass over the models.
+
+        Params:
+        -------
+            new_values: value or list of values, starting from newest to
+            oldest, all of them newer than the current data.
+
+            recheck: default 100, after how many new values the
+            stationarity is tested again, if the needed integrations change
+            the model is rebuilt from the whole data.
+
+        Models built with a search strategy, budget or top_k are searched
+        again.
+        '''
+        if not hasattr(self, '_moments'):
+            self.build()
+        new_values = np.array(new_values, dtype=float).reshape(-1)
+        self.base = np.concatenate(
+            (new_values.reshape((-1,)+self.base.shape[1:]), self.base))
+        head = np.diff(
+            self.base[:len(new_values)+self.integrations].reshape(-1),
+            n=self.integrations)
+        self.data = np.concatenate((head.reshape(-1, 1), self.data))
+        self._ticks += len(new_values)
+        if recheck and self._ticks >= recheck:
+            integrations, _ = data_tests.stationarity.forceSTAT(self.base)
+            if integrations is not None and \
+                    integrations != self.integrations:
+                self.data = self.base
+                self.all_models = model_table()
+                self._test_data()
+                return self.build(**self._options)
+            self._ticks = 0
+        if self._moments is None:
+            # searched models have no moments, the search is repeated
+            ticks = self._ticks
+            self.build(**self._options)
+            self._ticks = ticks
+            return self.best
+        for x in range(len(new_values)-1, -1, -1):
+            kernels.add_arima_row(self._moments, self.data[x:], self.lags)
+        self._fill_models()
+        self.current_models.touch(self)
         return self.best
 
     def _decode_key(self, key):
@@ -175,27 +332,91 @@ class ARIMA:
             key = self._key_integrity(model)
             model_dict = self.all_models[key]
         AR, MA = self._decode_key(key)
-        data = AR if AR > MA else MA
-        data = AR if AR > MA else MA
-        data = self.data[:data]
-        base = self.base[:self.integrations+1]
-        for t in range(periods):
-            result = data[AR-1]*model_dict['AR'] + \
-                np.mean(data[:MA]*model_dict['MA'])
-            data = np.insert(data, 0, result, 0)
-            if self.integrations > 0:
-                add = [base[0]]
-                for t in range(self.integrations):
-                    add.append(np.diff(base[:t+2]))
-                base = np.insert(base, 0, result+sum(add))
-            else:
-                base = np.insert(base, 0, result)
-            self.prediction = {'key': key,
-                               'periods(t)': 't+n ... t+3, t+2, t+1',
-                               'prediction': data[:periods],
-                               're-integrated': base[:-(self.integrations+1)]}
+        forecast = kernels.forecast(
+            self.data, periods,
+            ar_lags=[[AR]], ar_coefs=[[model_dict['AR']]],
+            ma_windows=[[MA]], ma_coefs=[[model_dict['MA']]])[0]
+        self.prediction = {'key': key,
+                           'periods(t)': 't+n ... t+3, t+2, t+1',
+                           'prediction': forecast.reshape(-1, 1),
+                           're-integrated': kernels.reintegrate(
+                               forecast, self._levels())}
         return self.prediction
 
+    def predict_many(self, models=5, periods=31):
+        '''
+        Predicts many models in one vectorized pass.
+
+        Params:
+        -------
+            models: default 5, int - the top models of self.all_models by R,
+            or list of model keys (as in self.predict).
+
+            periods: default 31, number of predicted periods.
+
+        Returns dict with the keys and 2-D arrays with a row per model,
+        columns from the furthest to the closest (t+n...t+1).
+        '''
+        if isinstance(models, int):
+            keys = list(self.all_models.top(models))
+        else:
+            keys = [self._key_integrity(key) for key in models]
+        specs = [self.all_models[key] for key in keys]
+        lags = np.array([self._decode_key(key) for key in keys]).reshape(-1, 2)
+        forecast = kernels.forecast(
+            self.data, periods,
+            ar_lags=lags[:, :1], ar_coefs=[[s['AR']] for s in specs],
+            ma_windows=lags[:, 1:], ma_coefs=[[s['MA']] for s in specs])
+        return {'keys': keys,
+                'periods(t)': 't+n ... t+3, t+2, t+1',
+                'prediction': forecast,
+                're-integrated': kernels.reintegrate(forecast, self._levels())}
+
+    def predict_intervals(self, periods=31, n_paths=1000,
+                          quantiles=(0.05, 0.5, 0.95), model='best',
+                          seed=None):
+        '''
+        Forecast intervals of a model by simulation:
+        ---------------------------------------------
+        The one step errors of the model on its data are resampled into
+        n_paths random paths, all forecast together and re-integrated.
+
+        Params:
+        -------
+            periods: default 31, number of predicted periods.
+
+            n_paths: default 1000, number of simulated paths.
+
+            quantiles: default (0.05, 0.5, 0.95), returned quantiles.
+
+            model: default 'best', as in self.predict.
+
+            seed: default None, seed of the random generator.
+
+        Returns dict with the key and the re-integrated 'intervals', an
+        array with a row per quantile, from the furthest to the closest
+        period (t+n...t+1).
+        '''
+        if model == 'best':
+            key = next(iter(self.best.keys()))
+            model_dict = self.best[key]
+        else:
+            key = self._key_integrity(model)
+            model_dict = self.all_models[key]
+        AR, MA = self._decode_key(key)
+        intervals = _intervals(
+            self.data, self._levels(), periods, n_paths, quantiles, seed,
+            {'ar_lags': AR, 'ar_coefs': model_dict['AR'],
+             'ma_windows': MA, 'ma_coefs': model_dict['MA']})
+        return {'key': key,
+                'periods(t)': 't+n ... t+3, t+2, t+1',
+                'quantiles': list(quantiles),
+                'intervals': intervals}
+
+    def _levels(self):
+        # latest value of every integration level, used to re-integrate
+        return kernels.levels(self.base, self.integrations)
+
     def __str__(self):
         # print the R2 of the best model and the model itself
         if self.best:
@@ -209,8 +430,8 @@ class LinearProjection:
     Linear projection is modeling the expected values of a timeseries
     by using as factor the change of the period i.e. (1,2,3,4,5...n).
 
-    current_models (invoked by self.current_models) - lists all instances
-    of the class.
+    current_models (invoked by self.current_models) - lists all live
+    instances of the class (registry.registry).
 
     #######
     self.build() is used to trigger the solution of the model.
@@ -231,7 +452,7 @@ class LinearProjection:
     integrate: optional bool, default = False.
     Determines should predict force stationarity.
     '''
-    current_models = []
+    current_models = registry()
 
     def __init__(self, data, integrate=False):
         '''
@@ -247,11 +468,11 @@ class LinearProjection:
         self._turn_to_np(): private method
         buils self.base - copy of the initial data.
         '''
-        self.current_models.append(self)
         self.data = data
         self.periods = len(self.data)+1
         self.integrations = 0
         self._turn_to_np(integrate)
+        self.current_models.append(self)
 
     def _turn_to_np(self, integrate):
         # convert to numpy and makes a backup
@@ -273,6 +494,7 @@ class LinearProjection:
                                                            self.data)**2,
                                                model.intercept_[0],
                                                model.coef_[0][0])
+        self.current_models.touch(self)
 
     def predict(self, periods=30):
         '''
@@ -298,17 +520,23 @@ class LinearProjection:
         return self.prediction
 
 
+# strategies of _simple_lag.build
+_SUBSET_STRATEGIES = ('exhaustive', 'branch_and_bound', 'forward', 'backward')
+
+
 class _simple_lag:
-    current_models = []
+    current_models = registry()
     # parent class
 
-    def __init__(self, data, n_factors, lags, integrate=True):
-        self.current_models.append(self)
+    def __init__(self, data, n_factors, lags, integrate=True, cache=None):
         self.data = data
         self.lags = lags+1
         self.all_models = {}
         self.n_factors = n_factors
+        self.integrate = integrate
+        self.cache = _open_cache(cache)
         self._turn_to_np
+        self.current_models.append(self)
 
     def _turn_to_np(self, integrate):
         # convert to numpy and makes a backup
@@ -317,6 +545,44 @@ class _simple_lag:
         self.data = np.array(self.data).reshape(-1, 1)
         self.base = np.copy(self.data)
 
+    def build(self, strategy='exhaustive', screen=None, screen_top=None):
+        '''
+        Solves the models and returns the best one,
+        with self.cache the result is read from / written to the disk.
+
+        strategy: default 'exhaustive', how the n_factors lags are selected:
+            'exhaustive' - every set of lags is solved and stored,
+            'branch_and_bound' - the same best model, without solving
+            the sets which could not beat it,
+            'forward' / 'backward' - greedy stepwise selection,
+            for very large lags.
+        Other than 'exhaustive' only the selected model is stored.
+        screen: default None, 'pacf' or 'acf' - selects only from the lags
+        with significant (partial) autocorrelation, at least n_factors;
+        screen_top: default None, with screen keeps the screen_top strongest.
+        self.search stores the strategy and how many models were solved.
+        '''
+        if strategy not in _SUBSET_STRATEGIES:
+            raise ValueError('strategy should be one of ' +
+                             str(_SUBSET_STRATEGIES))
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(type(self).__name__, self.lags,
+                                 self.n_factors, self.integrate, strategy,
+                                 screen, screen_top,
+                                 np.asarray(self.data, dtype=float))
+            stored = self.cache.get(key)
+            if stored is not None:
+                self.all_models, self.best, self.search = stored
+                self.current_models.touch(self)
+                return self.best
+        self._build(strategy, screen, screen_top)
+        self.best = self._check_all_models()
+        if key is not None:
+            self.cache.put(key, (self.all_models, self.best, self.search))
+        self.current_models.touch(self)
+        return self.best
+
     def _check_all_models(self):
         # under the condition that we use dict starting with the model than R
         key, spec = 'model', {'R': 0}
@@ -326,65 +592,113 @@ class _simple_lag:
         if key != 'model':
             return {key: spec}
 
-    def _cascade(self, n, m_type, model=''):
-        if n >= 1:
-            for t in range(2 if m_type == 'MA' else 1, self.lags):
-                self._cascade(n-1, model=model+m_type+str(t), m_type=m_type)
+    def _build(self, strategy='exhaustive', screen=None, screen_top=None):
+        # solves every set of n_factors different lags from one Gram matrix,
+        # or only the set selected by the strategy
+        if self.n_factors < 1:
+            print('n_factors incorrect!')
+            return
+        data = np.asarray(self.data, dtype=float).reshape(-1)
+        lags = self._screen(data, screen, screen_top)
+        columns = self._columns(data, lags)
+        candidates = comb(len(lags), self.n_factors)
+        if strategy == 'exhaustive':
+            subsets = np.array(
+                list(combinations(range(len(lags)), self.n_factors)),
+                dtype=int).reshape(-1, self.n_factors)
+            evaluated = len(subsets)
+        elif strategy == 'branch_and_bound':
+            subset, evaluated = search.best_subset(
+                data, columns, lags, self.n_factors)
+            subsets = np.array([subset] if subset else [], dtype=int)
+        else:
+            subset, evaluated = search.stepwise(
+                data, columns, lags, self.n_factors, direction=strategy)
+            subsets = np.array([subset], dtype=int)
+        self.search = {'strategy': strategy, 'evaluated': evaluated,
+                       'candidates': candidates}
+        if not len(subsets):
             return
-        elif n == 0:
-            model_list = model.split(m_type)
-            model_list.pop(0)
-            model_list = [int(t) for t in model_list]
-            factor = np.hstack(
-                [np.array(
-                    self._solve(t, max(model_list))).reshape(-1, 1)
-                 for t in model_list]
-            )
-            base = self.data[:-max(model_list)]
-            model_reg = linear_model.LinearRegression().fit(factor, base)
+        intercepts, coefs, score = kernels.subset_regressions(
+            data, columns, lags, subsets)
+        for subset, intercept, coef, R in zip(
+                subsets, intercepts, coefs, score**2):
+            model = ''.join(self.m_type+str(lags[t]) for t in subset)
             self.all_models[model] = {
-                str(n)+'_'+m_type: t for n, t in enumerate(
-                    model_reg.coef_,
-                    start=1)
+                str(n)+'_'+self.m_type: t for n, t in enumerate(coef, start=1)
             }
-            self.all_models[model]['Intercept'] = model_reg.intercept_
-            self.all_models[model]['R'] = model_reg.score(factor, base)**2
-        else:
-            print('n_factors incorrect!')
+            self.all_models[model]['Intercept'] = intercept
+            self.all_models[model]['R'] = R
+
+    def predict_intervals(self, periods=30, n_paths=1000,
+                          quantiles=(0.05, 0.5, 0.95), model='best',
+                          seed=None):
+        '''
+        Forecast intervals of a model by simulation, the one step errors
+        of the model are resampled into n_paths paths forecast together.
+            periods [int, default=30] - number of predicted periods;
+            n_paths [int, default=1000] - number of simulated paths;
+            quantiles [list of float, default=(0.05, 0.5, 0.95)];
+            model [str, default='best'] - as in self.predict;
+            seed [int, default=None] - seed of the random generator.
+        Returns dict with the model and 'intervals', a row per quantile
+        (t+n ... t+1), re-integrated when the data was integrated.
+        '''
+        key, factors = self._factors(model)
+        levels = kernels.levels(self.base, self.integrations) \
+            if getattr(self, 'integrations', 0) else []
+        intervals = _intervals(
+            np.asarray(self.data, dtype=float), levels, periods, n_paths,
+            quantiles, seed, factors)
+        return {'model': key, 'periods': 't+n ... t+3, t+2, t+1',
+                'quantiles': list(quantiles), 'intervals': intervals}
+
+    def _screen(self, data, screen, screen_top):
+        # lags kept by the screen, a lag l is MA(l+1) as in ARIMA
+        if screen is None:
+            return np.arange(self._first_lag, self.lags)
+        lags = kernels.screen_lags(data, self.lags, kind=screen,
+                                   top=screen_top)
+        if len(lags) < self.n_factors:
+            lags = kernels.screen_lags(data, self.lags, kind=screen,
+                                       top=self.n_factors)
+        lags = lags + self._first_lag-1
+        return lags[lags < self.lags]
 
 
 class AutoReg(_simple_lag):
     # first child using multiple autoregressive factors (3 def)
     # make predictions
-    def __init__(self, data, lags=30, n_factors=3, integrate=True):
-        super().__init__(data, n_factors, lags, integrate=True)
+    m_type = 'AR'
+    _first_lag = 1
 
-    def _solve(self, lag, max_lenght):
-        end = lag-max_lenght if lag != max_lenght else None
-        return self.data[lag:end]
+    def __init__(self, data, lags=30, n_factors=3, integrate=True,
+                 cache=None):
+        super().__init__(data, n_factors, lags, integrate=True, cache=cache)
 
-    def build(self):
-        self._cascade(self.n_factors, m_type='AR')
-        self.best = self._check_all_models()
-        return self.best
+    def _columns(self, data, lags):
+        # column of every lag, row x is data[lag+x]
+        return kernels.lagged_columns(data, lags)
 
-    def predict(self, periods=30, model='best'):
+    def _factors(self, model):
+        # key of the model and its factors for kernels.forecast
         if model == 'best':
             key = next(iter(self.best.keys()))
             spec = self.best[key]
         else:
             key = model
             spec = self.all_models[key]
-        key = key.split('AR')
-        key.pop(0)
-        key = [int(t) for t in key]
-        data = self.data[:self.lags]
-        for _ in range(periods+1):
-            base = 0
-            for n, t1 in enumerate(key, start=1):
-                base += spec[str(n)+'_AR']*data[t1-1]
-            data = np.insert(data, 0, base+spec['Intercept'])
-        self.prediction = {model: data[:periods+1],
+        lags = [int(t) for t in key.split('AR')[1:]]
+        return key, {'intercepts': spec['Intercept'], 'ar_lags': lags,
+                     'ar_coefs': [spec[str(n)+'_AR']
+                                  for n in range(1, len(lags)+1)]}
+
+    def predict(self, periods=30, model='best'):
+        _, factors = self._factors(model)
+        forecast = kernels.forecast(
+            self.data, periods+1, intercepts=factors['intercepts'],
+            ar_lags=[factors['ar_lags']], ar_coefs=[factors['ar_coefs']])
+        self.prediction = {model: forecast[0],
                            'periods': 't+n ... t+3, t+2, t+1'}
         return self.prediction
 
@@ -392,37 +706,38 @@ class AutoReg(_simple_lag):
 class MovingAvg(_simple_lag):
     # first child using multiple autoregressive factors (3 def)
     # make predictions
-    def __init__(self, data, lags=30, n_factors=3, integrate=True):
-        super().__init__(data, n_factors, lags, integrate=True)
+    m_type = 'MA'
+    _first_lag = 2
 
-    def _solve(self, lag, max_lenght):
-        return np.array(
-            [np.mean(
-                self.data[0+t: lag+t]) for t in range(len(
-                    self.data[max_lenght:]))
-             ])
+    def __init__(self, data, lags=30, n_factors=3, integrate=True,
+                 cache=None):
+        super().__init__(data, n_factors, lags, integrate=True, cache=cache)
 
-    def build(self):
-        self._cascade(self.n_factors, m_type='MA')
-        self.best = self._check_all_models()
-        return self.best
+    def _columns(self, data, lags):
+        # column of every lag, row x is the mean of data[x: lag+x]
+        return np.nan_to_num(kernels.rolling_means(
+            data, lags, count=len(data)), nan=0.)
 
-    def predict(self, periods=30, model='best'):
+    def _factors(self, model):
+        # key of the model and its factors for kernels.forecast
         if model == 'best':
             key = next(iter(self.best.keys()))
             spec = self.best[key]
         else:
             key = model
             spec = self.all_models[key]
-        key = key.split('MA')
-        key.pop(0)
-        key = [int(t) for t in key]
-        data = self.data[:self.lags]
-        for _ in range(periods+1):
-            base = 0
-            for n, t1 in enumerate(key, start=1):
-                base += spec[str(n)+'_MA']*np.mean(data[0:t1-1])
-            data = np.insert(data, 0, base+spec['Intercept'])
-        self.prediction = {model: data[:periods+1],
+        lags = [int(t) for t in key.split('MA')[1:]]
+        return key, {'intercepts': spec['Intercept'],
+                     'ma_windows': [t-1 for t in lags],
+                     'ma_coefs': [spec[str(n)+'_MA']
+                                  for n in range(1, len(lags)+1)]}
+
+    def predict(self, periods=30, model='best'):
+        _, factors = self._factors(model)
+        forecast = kernels.forecast(
+            self.data, periods+1, intercepts=factors['intercepts'],
+            ma_windows=[factors['ma_windows']],
+            ma_coefs=[factors['ma_coefs']])
+        self.prediction = {model: forecast[0],
                            'periods': 't+n ... t+3, t+2, t+1'}
         return self.prediction
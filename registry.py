@@ -0,0 +1,132 @@
+"""
+registry replaces the plain current_models lists of the models, which kept
+every instance (with its data and all_models) alive for the whole process.
+"""
+import sys
+import weakref
+from collections import OrderedDict
+import numpy as np
+try:
+    from .table import model_table
+except Exception:
+    from table import model_table
+
+
+class registry:
+    def __init__(self, max_models=None, max_bytes=None, weak=True,
+                 enabled=True):
+        """
+        Keeps track of the instances of a model class, used as a list
+        (append, iteration, len, indexing).
+            max_models [int, default=None] - maximum kept instances;
+            max_bytes [int, default=None] - maximum estimated memory of the
+            kept instances, checked on every append;
+            weak [bool, default=True] - keep only weak references, instances
+            are forgotten as soon as nothing else uses them;
+            enabled [bool, default=True] - False keeps nothing.
+        Above the limits the least recently used instances are dropped,
+        self.touch(model) marks an instance as used.
+        The size of an instance is measured when it is appended or touched
+        (the models append themselves at the end of __init__ and touch
+        themselves after build), so checking the limits does not walk the
+        kept instances.
+        """
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.weak = weak
+        self.enabled = enabled
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+
+    def append(self, model):
+        if not self.enabled:
+            return
+        key = id(model)
+        if self.weak:
+            self._models[key] = weakref.ref(
+                model, lambda _, key=key: self._forget(key))
+        else:
+            self._models[key] = model
+        self._measure(key, model)
+        self.trim()
+
+    def touch(self, model):
+        # marks the instance as used and measures it again
+        if id(model) in self._models:
+            self._models.move_to_end(id(model))
+            self._measure(id(model), model)
+            self.trim()
+
+    def remove(self, model):
+        self._forget(id(model))
+
+    def clear(self):
+        self._models.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def _measure(self, key, model):
+        # caches the estimated size of the instance
+        new = size(model)
+        self._bytes += new - self._sizes.get(key, 0)
+        self._sizes[key] = new
+
+    def _forget(self, key):
+        self._models.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+
+    def _live(self):
+        # kept instances from least to most recently used
+        if not self.weak:
+            return list(self._models.values())
+        models = [ref() for ref in list(self._models.values())]
+        return [model for model in models if model is not None]
+
+    def __iter__(self):
+        return iter(self._live())
+
+    def __len__(self):
+        return len(self._live())
+
+    def __getitem__(self, index):
+        return self._live()[index]
+
+    def __repr__(self):
+        return repr(self._live())
+
+    def trim(self):
+        # drops the least recently used instances above the limits,
+        # the most recent one is always kept
+        while self.max_models is not None and \
+                len(self._models) > self.max_models:
+            self._forget(next(iter(self._models)))
+        while self.max_bytes is not None and len(self._models) > 1 and \
+                self._bytes > self.max_bytes:
+            self._forget(next(iter(self._models)))
+
+    def memory(self):
+        # estimated bytes used by the kept instances, as last measured
+        return self._bytes
+
+
+def size(model):
+    """
+    Estimated bytes of a model instance: numpy arrays by nbytes,
+    model tables (all_models) by their records, dicts and lists
+    by their content.
+    """
+    return sum(_size(value) for value in vars(model).values())
+
+
+def _size(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, model_table):
+        return sys.getsizeof(value) + value.records.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(key) + _size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_size(item) for item in value)
+    return sys.getsizeof(value)
@@ -3,9 +3,33 @@ from scipy.stats import f as fdist
 from statsmodels.regression.linear_model import OLS
 from statsmodels.tools import add_constant
 try:
-    from . import data_tests
+    from . import data_tests, kernels
 except Exception:
     import data_tests
+    import kernels
+
+
+# default regression backend of rolling and causality, see set_backend
+backend = 'numpy'
+_BACKENDS = ('numpy', 'statsmodels')
+
+
+def set_backend(name):
+    """
+    Selects the default regression backend of rolling and causality:
+        'numpy' - all windows / lags solved together by the numpy kernels;
+        'statsmodels' - the reference, one statsmodels OLS per window / lag.
+    Every fit also takes backend to override it for one call.
+    """
+    global backend
+    backend = _backend(name)
+
+
+def _backend(name=None):
+    name = backend if name is None else name
+    if name not in _BACKENDS:
+        raise ValueError('backend should be one of '+str(_BACKENDS))
+    return name
 
 
 def linear_regression(Y, X, multiple_X=1, fix_nan=True, alfa=False, integrate=False):
@@ -15,7 +39,14 @@ def linear_regression(Y, X, multiple_X=1, fix_nan=True, alfa=False, integrate=Fa
     Y(list[float]) - dependent variable;
     X([list[float] | float]) - independent variable;
     multiple_X [int, default=1] if there are mutiple factors (Xes), set the number of factor columns
+    A 2-D Y with a column per target is solved in batch mode, see _batch_ols.
     """
+    if np.ndim(Y) == 2 and np.shape(Y)[1] > 1:
+        if integrate:
+            raise ValueError('integrate is not supported with many Y')
+        X = np.array(X, dtype=float).reshape(-1, multiple_X)
+        return _batch_ols(np.array(Y, dtype=float),
+                          add_constant(X) if alfa else X, fix_nan)
     Y = np.array(Y).reshape(-1, 1)
     X = np.array(X).reshape(-1, multiple_X)
     if integrate:
@@ -26,6 +57,273 @@ def linear_regression(Y, X, multiple_X=1, fix_nan=True, alfa=False, integrate=Fa
     return model if not integrate else (model, integrations)
 
 
+def _batch_ols(Y, X, fix_nan=True):
+    """
+    OLS of every column of Y on X, as statsmodels OLS with
+    missing='drop' (fix_nan) per target: X'X and X'Y are formed once,
+    for every pattern of missing Y values only the dropped rows are
+    taken out of X'X and all the targets of the pattern are solved
+    together. X'X squares the condition of X, so an ill-conditioned or
+    singular pattern is solved from the pseudo-inverse and rank of its
+    rows of X instead, as statsmodels.
+    Returns dict of arrays, a row per target: params, bse, tvalues
+    (targets x factors), rsquared, nobs and df_resid.
+    """
+    count = Y.shape[1]
+    k = X.shape[1]
+    result = {'params': np.full((count, k), np.nan),
+              'bse': np.full((count, k), np.nan),
+              'rsquared': np.full(count, np.nan),
+              'nobs': np.zeros(count, dtype=int),
+              'df_resid': np.full(count, np.nan)}
+    valid = ~np.isnan(X).any(axis=1) if fix_nan else np.ones(len(X), bool)
+    if fix_nan:
+        missing = np.isnan(Y) | ~valid[:, None]
+    else:
+        missing = np.zeros(Y.shape, dtype=bool)
+    # moments of all the rows, missing values count as 0
+    X = np.where(valid[:, None], X, 0.)
+    Y = np.where(missing, 0., Y)
+    gram, cross = X.T @ X, X.T @ Y
+    squares, sums = (Y**2).sum(axis=0), Y.sum(axis=0)
+    # centered R squared when X has a constant column, as statsmodels
+    used = X[valid]
+    constant = len(used) and \
+        ((np.ptp(used, axis=0) == 0) & (used[0] != 0)).any()
+    # targets grouped by their pattern of missing rows, packed to bytes
+    keys = np.ascontiguousarray(np.packbits(missing, axis=0).T)
+    keys = keys.view(np.dtype((np.void, keys.shape[1]))).reshape(-1)
+    _, first, groups, counts = np.unique(
+        keys, return_index=True, return_inverse=True, return_counts=True)
+    order = np.argsort(groups.reshape(-1), kind='stable')
+    for start, size, target in zip(np.cumsum(counts)-counts, counts, first):
+        targets = order[start:start+size]
+        dropped = X[missing[:, target] & valid]
+        A = gram - dropped.T @ dropped
+        rows = len(X) - int(missing[:, target].sum())
+        if not np.isfinite(A).all():
+            result['nobs'][targets] = rows
+            continue
+        values, vectors = np.linalg.eigh(A)
+        if values.min() > values.max()*np.sqrt(np.finfo(float).eps):
+            # X'X keeps at least half of the digits
+            inverse = (vectors/values) @ vectors.T
+            b = cross[:, targets]
+            params = inverse @ b
+            ssr = squares[targets] - (params*b).sum(axis=0)
+            rank = k
+        else:
+            used = X[~missing[:, target]]
+            pinv = np.linalg.pinv(used)
+            inverse = pinv @ pinv.T
+            params = pinv @ Y[~missing[:, target]][:, targets]
+            ssr = ((Y[~missing[:, target]][:, targets] -
+                    used @ params)**2).sum(axis=0)
+            rank = np.linalg.matrix_rank(used) if rows else 0
+        df_resid = rows - rank
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tss = squares[targets] - sums[targets]**2/rows if constant \
+                else squares[targets]
+            scale = ssr/df_resid
+            result['rsquared'][targets] = 1 - ssr/tss
+            result['bse'][targets] = np.sqrt(
+                np.outer(scale, np.diag(inverse)))
+        result['params'][targets] = params.T
+        result['nobs'][targets] = rows
+        result['df_resid'][targets] = df_resid
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result['tvalues'] = result['params']/result['bse']
+    return result
+
+
+def _granger(Y, X, test_lags):
+    """
+    R squared of the restricted (constant and Y lags 1...lag) and full
+    (also X lags 1...lag) regressions of Y for every lag up to test_lags,
+    and the rows of every lag (len(Y)-lag). The lagged design is built once,
+    the Gram matrix of the highest lag is computed once and every lower lag
+    adds its one extra row; each model is a small solve of its columns.
+    Rows with nan are dropped per model, as OLS(missing='drop').
+    """
+    y = np.asarray(Y, dtype=float).reshape(-1)
+    x = np.asarray(X, dtype=float).reshape(-1)
+    n = len(y)
+    lags = np.arange(1, test_lags+1)
+    # the constant is in every model, centering does not change R squared
+    with np.errstate(invalid='ignore'):
+        y = y - np.nanmean(y)
+        x = x - np.nanmean(x)
+    design = np.hstack((np.ones((n, 1)), kernels.lagged_columns(y, lags),
+                        kernels.lagged_columns(x, lags), y.reshape(-1, 1)))
+    target = design.shape[1]-1
+    auto_R, full_R = np.full(test_lags, np.nan), np.full(test_lags, np.nan)
+    N = n - lags
+    missing = np.isnan(design).any()
+    gram = None
+    for lag in lags[::-1]:
+        rows = n-lag
+        auto = np.arange(lag+1)
+        full = np.concatenate((auto, test_lags+lags[:lag]))
+        if rows <= 0:
+            continue
+        if missing:
+            auto_R[lag-1] = _r_squared(_gram(design[:rows], auto, target),
+                                       len(auto))
+            full_R[lag-1] = _r_squared(_gram(design[:rows], full, target),
+                                       len(full))
+            continue
+        if gram is None:
+            gram = design[:rows].T @ design[:rows]
+        else:
+            gram += np.outer(design[rows-1], design[rows-1])
+        for columns, R in ((auto, auto_R), (full, full_R)):
+            columns = np.append(columns, target)
+            R[lag-1] = _r_squared(gram[np.ix_(columns, columns)],
+                                  len(columns)-1)
+    return auto_R, full_R, N
+
+
+def _granger_targets(data, targets, test_lags, block=256):
+    """
+    R squared of the restricted model of every target series of data and
+    of its full models with every series of data as the cause, for lags
+    1...test_lags (arrays lags x targets and lags x series x targets).
+    data [2-D array] - stationary series of the same length as rows.
+    The restricted regression of a target is solved once per lag and the
+    causes are projected off it (Frisch-Waugh): their lagged columns and
+    cross-products are built once for all targets, so every full model
+    only adds a lag x lag solve.
+    """
+    data = np.asarray(data, dtype=float)
+    count, n = data.shape
+    auto_R = np.full((test_lags, len(targets)), np.nan)
+    full_R = np.full((test_lags, count, len(targets)), np.nan)
+    for lag in range(1, test_lags+1):
+        rows = n-lag
+        if rows <= 2*lag+1:
+            break
+        index = np.arange(rows).reshape(-1, 1) + np.arange(1, lag+1)
+        restricted = []
+        for t, target in enumerate(targets):
+            y = data[target, :rows]
+            Q, _ = np.linalg.qr(np.hstack((np.ones((rows, 1)),
+                                           data[target, index])))
+            residual = y - Q @ (Q.T @ y)
+            ssr = residual @ residual
+            tss = ((y - y.mean())**2).sum()
+            auto_R[lag-1, t] = 1 - ssr/tss
+            restricted.append((Q, residual, ssr, tss))
+        for first in range(0, count, block):
+            # lagged columns of a block of causes, rows x (cause, lag)
+            X = data[first:first+block, index].transpose(1, 0, 2)
+            gram = np.einsum('rbl,rbk->blk', X, X)
+            X = X.reshape(rows, -1)
+            for t, (Q, residual, ssr, tss) in enumerate(restricted):
+                P = (Q.T @ X).reshape(len(Q.T), -1, lag)
+                c = (residual @ X).reshape(-1, lag)
+                beta = _solve(gram - np.einsum('kbl,kbm->blm', P, P), c)
+                full_R[lag-1, first:first+block, t] = \
+                    1 - (ssr - (beta*c).sum(axis=1))/tss
+    # a series as its own cause repeats the restricted columns
+    full_R[:, targets, np.arange(len(targets))] = np.nan
+    return auto_R, full_R
+
+
+def _granger_test(r_full, r_reduced, N, df):
+    # p-value of causality.build, works on arrays
+    return 1 - fdist.cdf(
+        (r_full-r_reduced)*(N-df*2-1)/(1-r_full)/df,
+        df,
+        (N-df*2-1)/(1-r_full)
+    )
+
+
+def _gram(design, columns, target):
+    # Gram matrix of the columns and the target on the rows without nan
+    columns = np.append(columns, target)
+    used = design[:, columns]
+    used = used[~np.isnan(used).any(axis=1)]
+    return used.T @ used
+
+
+def _r_squared(gram, k):
+    # R squared of the regression with a constant (first column) of the
+    # last column on the first k, from their Gram matrix, or from a stack
+    # of Gram matrices
+    single = gram.ndim == 2
+    gram = gram.reshape((-1,)+gram.shape[-2:])
+    A, b, yy = gram[:, :k, :k], gram[:, :k, k], gram[:, k, k]
+    beta = _solve(A, b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tss = yy - gram[:, 0, k]**2/gram[:, 0, 0]
+        R = 1 - (yy - (beta*b).sum(axis=1))/tss
+    R = np.where(gram[:, 0, 0] <= k, np.nan, R)
+    return R[0] if single else R
+
+
+def _granger_windows(Y, X, test_lags, length, anchor=4096, budget=2**21):
+    """
+    R squared of the restricted and full models of causality.build in
+    every window of length observations (arrays windows x lags), windows
+    from the newest, and the rows of every lag (length-lag).
+    The Gram matrix of a window and model is read from anchored prefix
+    sums of the products of the lagged design, O(k^2) per window and lag.
+    Rows with nan in the columns of a model are left out of it, as
+    statsmodels missing='drop', the models leaving out the same rows share
+    their prefix sums. The windows are solved in chunks, so the prefix
+    sums of a chunk hold about budget floats (at least 3*length rows).
+    """
+    y = np.asarray(Y, dtype=float).reshape(-1)
+    x = np.asarray(X, dtype=float).reshape(-1)
+    n = len(y)
+    lags = np.arange(1, test_lags+1)
+    with np.errstate(invalid='ignore'):
+        y = y - np.nanmean(y)
+        x = x - np.nanmean(x)
+    design = np.hstack((np.ones((n, 1)), kernels.lagged_columns(y, lags),
+                        kernels.lagged_columns(x, lags), y.reshape(-1, 1)))
+    size = design.shape[1]
+    count = max(n-length+1, 0)
+    auto_R = np.full((count, test_lags), np.nan)
+    full_R = np.full((count, test_lags), np.nan)
+    # models with the same rows left out share their prefix sums,
+    # without nan all of them do
+    missing = np.isnan(design)
+    groups = {}
+    for lag in lags[lags < length]:
+        auto = np.append(np.arange(lag+1), size-1)
+        full = np.concatenate((np.arange(lag+1), test_lags+lags[:lag],
+                               [size-1]))
+        for R, columns in ((auto_R, auto), (full_R, full)):
+            key = missing[:, columns].any(axis=1).tobytes()
+            groups.setdefault(key, []).append((R, lag, columns))
+    for group in groups.values():
+        columns = np.unique(np.concatenate([model[2] for model in group]))
+        drop = missing[:, columns].any(axis=1)
+        # chunks sized by the shared columns, at least a few lengths
+        # of windows each
+        k = len(columns)
+        step = max(budget // k**2 - length, 2*length)
+        for first in range(0, count, step):
+            # windows first ... last-1 use the rows first ... last+length-2
+            last = min(first+step, count)
+            used = np.where(drop[first:last+length-1, None], 0.,
+                            design[first:last+length-1][:, columns])
+            blocks, local, anchor_ = kernels.anchored_prefix(
+                (used[:, :, None]*used[:, None, :]).reshape(
+                    len(used), -1), anchor)
+            starts = np.arange(last-first)
+            for R, lag, model in group:
+                index = np.searchsorted(columns, model)
+                flat = (index[:, None]*k + index).reshape(-1)
+                gram = kernels.window_sums(
+                    (blocks[:, flat], local[:, flat], anchor_), starts,
+                    starts+length-lag)
+                R[first:last, lag-1] = _r_squared(
+                    gram.reshape(-1, len(model), len(model)), len(model)-1)
+    return auto_R, full_R, length - lags
+
+
 class causality:
     def __init__(self, Y, X):
         """
@@ -42,77 +340,100 @@ class causality:
         self.X = X
         self.YL, self.XL = 'Y', 'X'
 
-    def fit(self, test_lags=5, labels_yx=(None, None), integrate=True, reverse=False):
+    def fit(self, test_lags=5, labels_yx=(None, None), integrate=True,
+            reverse=False, backend=None):
         """
         Fits the data to the model.
             test_lags [int, default= 5] - lags to test for causality;
             labels_yx [(tuple, string) default = (None, None)] - tuple of two strings - label_y and label_x;
             integrate [boolean, default= True] - integrates data to reach stationarity;
-            reverse [boolean, default= False] - test reverse causality.
+            reverse [boolean, default= False] - test reverse causality;
+            backend [str, default=None] - 'numpy' or 'statsmodels',
+            by default regression.backend.
         """
-        self.fix_data()
-        if integrate:
-            self.integrations, self.Y, self.X = data_tests.stationarity.forceSTATxy(
-                self.Y, self.X)
-            if self.integrations == None:
-                return
-        if isinstance(labels_yx, tuple):
-            if labels_yx[0] != None and labels_yx[1] != None:
-                self.YL, self.XL = str(labels_yx[0]), str(labels_yx[1])
-        self.result = self.build(test_lags)
+        if not self._prepare(labels_yx, integrate):
+            return
+        self.result = self.build(test_lags, backend)
         if reverse:
             self.X, self.Y = self.Y, self.X
             self.XL, self.YL = self.YL, self.XL
-            self.reversed_xy = self.build(test_lags)
+            self.reversed_xy = self.build(test_lags, backend)
             self.Y, self.X = self.X, self.Y
             self.XL, self.YL = self.YL, self.XL
 
-    def build(self, test_lags):
+    def fit_rolling(self, length=250, test_lags=5, labels_yx=(None, None),
+                    integrate=True, anchor=4096, backend=None):
+        """
+        Tests the causality in every window of length observations, from the
+        newest window to the oldest, as self.build on the window.
+            length [int, default=250] - observations in a window;
+            test_lags, labels_yx - as in self.fit;
+            integrate [boolean, default= True] - integrates the whole data
+            once to reach stationarity;
+            anchor [int, default=4096] - the window sums are re-anchored
+            every anchor rows for precision;
+            backend [str, default=None] - as in self.fit.
+        self.rolling_result holds arrays windows x lags: value,
+        the decisions (X => Y), full_model RSQ, and used_datapoints per lag.
+        """
+        if not self._prepare(labels_yx, integrate):
+            return
+        if _backend(backend) == 'statsmodels':
+            windows = [_granger_reference(self.Y[p:p+length],
+                                          self.X[p:p+length], test_lags)
+                       for p in range(max(len(self.Y)-length+1, 0))]
+            auto_R, full_R = (np.array([w[i] for w in windows]).reshape(
+                -1, test_lags) for i in (0, 1))
+            N = length - np.arange(1, test_lags+1)
+        else:
+            auto_R, full_R, N = _granger_windows(
+                self.Y, self.X, test_lags, length, anchor)
+        lags = np.arange(1, test_lags+1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            value = _granger_test(full_R, auto_R, N, lags)
+        self.rolling_result = {'lags': lags.tolist(),
+                               self.XL+' => '+self.YL: value < 0.05,
+                               'value': value, 'full_model RSQ': full_R,
+                               'used_datapoints': N.tolist()}
+        return self.rolling_result
+
+    def _prepare(self, labels_yx, integrate):
+        # fixes the data, integrates it and sets the labels for fit and
+        # fit_rolling, False when the data could not be made stationary
+        self.fix_data()
+        if integrate:
+            self.integrations, self.Y, self.X = \
+                data_tests.stationarity.forceSTATxy(self.Y, self.X)
+            if self.integrations is None:
+                return False
+        if isinstance(labels_yx, tuple):
+            if labels_yx[0] is not None and labels_yx[1] is not None:
+                self.YL, self.XL = str(labels_yx[0]), str(labels_yx[1])
+        return True
+
+    def build(self, test_lags, backend=None):
+        # restricted (only Y lags) and full models of every lag from one
+        # Gram matrix of the lagged design (_granger), or by statsmodels
         results = {'lags': [], self.XL+' => '+self.YL: [], 'value': [],
                    'full_model RSQ': [], 'used_datapoints': []}
+        solver = _granger_reference if _backend(backend) == 'statsmodels' \
+            else _granger
+        auto_R, full_R, N = solver(self.Y, self.X, test_lags)
         for lag in range(1, test_lags+1):
-            lag_counts = lag
-            passed_lags = 0
-            base = np.copy(self.Y)[:-lag]
-            auto_regressor = np.copy(self.Y)[lag:]
-            regressor = np.hstack((auto_regressor, self.X[lag:]))
-            while lag_counts > 1:
-                lag_counts -= 1
-                passed_lags -= 1
-                auto_regressor = np.hstack(
-                    (auto_regressor, self.Y[lag_counts:passed_lags]))
-                regressor = np.hstack(
-                    (regressor, self.Y[lag_counts:passed_lags], self.X[lag_counts:passed_lags]))
-            # auto_regressor is first!!!
-            auto_model = OLS(
-                base,
-                add_constant(auto_regressor),
-                missing='drop'
-            ).fit()
-            full_model = OLS(
-                base,
-                add_constant(regressor),
-                missing='drop'
-            ).fit()
-            N = len(base)
             value = self._test(
-                full_model.rsquared, auto_model.rsquared, N, lag
+                full_R[lag-1], auto_R[lag-1], N[lag-1], lag
             )
             results['lags'].append(lag)
             results[self.XL+' => ' + self.YL].append(
                 True if value < 0.05 else False)
             results['value'].append(value)
-            results['full_model RSQ'].append(full_model.rsquared)
-            results['used_datapoints'].append(N)
+            results['full_model RSQ'].append(full_R[lag-1])
+            results['used_datapoints'].append(N[lag-1])
         return results
 
     def _test(self, r_full, r_reduced, N, df):
         # df is the sama as doubled the lags
-        return 1 - fdist.cdf(
-            (r_full-r_reduced)*(N-df*2-1)/(1-r_full)/df,
-            df,
-            (N-df*2-1)/(1-r_full)
-        )
+        return _granger_test(r_full, r_reduced, N, df)
 
     def fix_data(self):
         if isinstance(self.Y[0], str):
@@ -125,6 +446,110 @@ class causality:
         self.Y = np.array(self.Y).reshape(-1, 1)
 
 
+def _window_prefix(X, Y, alfa, anchor=4096):
+    # anchored prefix sums of the used rows, [X, y] and their products,
+    # shared by all the windows, and the shift of the data;
+    # rows with nan are left out, as statsmodels missing='drop'
+    X = np.asarray(X, dtype=float).reshape(len(X), -1)
+    values = np.hstack((X, np.asarray(Y, dtype=float).reshape(-1, 1)))
+    used = ~np.isnan(values).any(axis=1)
+    # shifting by the means keeps the sums small, alfa is shifted back
+    shift = values[used].mean(axis=0) if alfa and used.any() else \
+        np.zeros(values.shape[1])
+    values = np.where(used[:, None], values - shift, 0.)
+    products = values[:, :, None] * values[:, None, :]
+    moments = np.hstack((used[:, None], values,
+                         products.reshape(len(values), -1)))
+    return kernels.anchored_prefix(moments, anchor), shift
+
+
+def _window_result(prefix, shift, starts, ends, labels, alfa):
+    # rolling result of the windows X[starts[j]: ends[j]]
+    sums = kernels.window_sums(prefix, starts, ends)
+    count = np.rint(sums[:, 0])
+    R, beta, intercept = _window_fit(count, sums[:, 1:], len(shift)-1, alfa)
+    result = {'R_squared': R, 'N_observations': count.astype(int)}
+    for i, label in enumerate(labels):
+        result[label] = beta[:, i]
+    if alfa:
+        result['alfa'] = intercept + shift[-1] - beta @ shift[:-1]
+    return result
+
+
+def _window_fit(count, sums, k, alfa):
+    # R squared, betas and alfa of every window from the sums of
+    # [X, y] and of their products, as statsmodels OLS
+    first = sums[:, :k+1]
+    second = sums[:, k+1:].reshape(-1, k+1, k+1)
+    if alfa:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = first/count[:, None]
+        second = second - first[:, :, None]*mean[:, None, :]
+    Sxx, Sxy, Syy = second[:, :k, :k], second[:, :k, k], second[:, k, k]
+    beta = _solve(Sxx, Sxy)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        R = (beta*Sxy).sum(axis=1)/Syy
+    intercept = mean[:, k] - (beta*mean[:, :k]).sum(axis=1) if alfa \
+        else np.zeros(len(R))
+    return R, beta, intercept
+
+
+def _solve(A, b):
+    # batched solution of A x = b, singular systems by the pseudo-inverse
+    try:
+        return np.linalg.solve(A, b[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        singular = np.linalg.matrix_rank(A) < A.shape[-1]
+        result = np.empty(b.shape)
+        if (~singular).any():
+            result[~singular] = np.linalg.solve(
+                A[~singular], b[~singular][..., None])[..., 0]
+        result[singular] = np.einsum(
+            'bij,bj->bi', np.linalg.pinv(A[singular]), b[singular])
+        return result
+
+
+def _window_reference(X, Y, starts, ends, labels, alfa):
+    # reference backend: statsmodels OLS of every window
+    R, beta, intercept, count = [], [], [], []
+    for start, end in zip(starts, ends):
+        factors = add_constant(X[start:end]) if alfa else X[start:end]
+        model = OLS(Y[start:end], factors, missing='drop').fit()
+        params = np.asarray(model.params)
+        R.append(model.rsquared)
+        count.append(model.nobs)
+        beta.append(params[1:] if alfa else params)
+        intercept.append(params[0])
+    beta = np.array(beta).reshape(len(R), -1)
+    result = {'R_squared': np.array(R),
+              'N_observations': np.array(count, dtype=int)}
+    for i, label in enumerate(labels):
+        result[label] = beta[:, i]
+    if alfa:
+        result['alfa'] = np.array(intercept)
+    return result
+
+
+def _granger_reference(Y, X, test_lags):
+    # reference backend: two statsmodels OLS per lag, as _granger
+    Y = np.asarray(Y, dtype=float).reshape(-1, 1)
+    X = np.asarray(X, dtype=float).reshape(-1, 1)
+    auto_R, full_R, N = [], [], []
+    for lag in range(1, test_lags+1):
+        base = Y[:-lag]
+        auto_regressor = np.hstack([Y[j:len(Y)-lag+j]
+                                    for j in range(lag, 0, -1)])
+        regressor = np.hstack([np.hstack((Y[j:len(Y)-lag+j],
+                                          X[j:len(X)-lag+j]))
+                               for j in range(lag, 0, -1)])
+        auto_R.append(OLS(base, add_constant(auto_regressor),
+                          missing='drop').fit().rsquared)
+        full_R.append(OLS(base, add_constant(regressor),
+                          missing='drop').fit().rsquared)
+        N.append(len(base))
+    return np.array(auto_R), np.array(full_R), np.array(N)
+
+
 class rolling():
     """
     Makes rolling regressions for the dataset, testing changes in
@@ -144,33 +569,49 @@ class rolling():
         self.XL, YL = ['X'], 'Y'
         self.multiple_X = multiple_X
 
-    def fit(self, length=40, integrate=True, alfa=False):
+    def fit(self, length=40, integrate=True, alfa=False, anchor=4096,
+            expanding=False, backend=None):
+        """
+        Solves the regression of every window of length observations,
+        from the newest window to the oldest.
+            length [int | list of int, default=40] - observations in a
+            window, with a list every length is solved;
+            alfa [bool, default=False] - adds the constant (alfa);
+            anchor [int, default=4096] - the window sums are re-anchored
+            every anchor rows for precision, None never re-anchors;
+            expanding [bool, default=False] - also solves the expanding
+            windows, from every observation to the oldest one, with at least
+            the (smallest) length observations;
+            backend [str, default=None] - 'numpy' or 'statsmodels', by
+            default regression.backend.
+        All windows are solved together from running sums of X'X, X'y and
+        y'y (O(n) regardless of length), self.result holds arrays with a
+        value per window: R_squared, N_observations, the beta of every X
+        and alfa. With a list of lengths or expanding, self.result is keyed
+        by the length (and 'expanding') instead. Rows with nan are left out
+        of their windows, N_observations counts the used rows.
+        """
         self.fix_data()
-        self.result = {'R_squared': [], 'N_observations': []}
-        for label in self.XL:
-            self.result[label] = []
-        if alfa:
-            self.result['alfa'] = []
-        position = 0
-        base_Y = self.Y[0:length]
-        base_X = self.X[0:length]
-        if alfa:
-            base_X = add_constant(base_X)
-        while len(base_X) >= length and len(base_Y) == length:
-            model = OLS(base_Y, base_X).fit()
-            self.result['R_squared'].append(model.rsquared)
-            self.result['N_observations'].append(length)
-            position += 1
-            base_Y = self.Y[position:length+position]
-            base_X = self.X[position:length+position:]
-            if alfa:
-                base_X = add_constant(base_X)
-                for i, label in enumerate(self.XL, start=1):
-                    self.result[label].append(model.params[i])
-                self.result['alfa'].append(model.params[0])
-            else:
-                for i, label in enumerate(self.XL):
-                    self.result[label].append(model.params[i])
+        n = len(self.Y)
+        lengths = np.atleast_1d(length).astype(int)
+        windows = {}
+        for size in lengths:
+            starts = np.arange(max(n-size+1, 0))
+            windows[int(size)] = (starts, starts+size)
+        if expanding:
+            starts = np.arange(max(n-lengths.min()+1, 0))
+            windows['expanding'] = (starts, np.full(len(starts), n))
+        if _backend(backend) == 'statsmodels':
+            result = {key: _window_reference(self.X, self.Y, starts, ends,
+                                             self.XL, alfa)
+                      for key, (starts, ends) in windows.items()}
+        else:
+            prefix, shift = _window_prefix(self.X, self.Y, alfa, anchor)
+            result = {key: _window_result(prefix, shift, starts, ends,
+                                          self.XL, alfa)
+                      for key, (starts, ends) in windows.items()}
+        self.result = result[int(length)] if np.ndim(length) == 0 and \
+            not expanding else result
 
     def fix_data(self):
         if isinstance(self.Y[0], str):
@@ -178,7 +619,7 @@ class rolling():
             self.Y.pop(0)
         if self.multiple_X == 1:
             if isinstance(self.X[0], str):
-                self.XL = self.X[0]
+                self.XL = [self.X[0]]
                 self.X.pop(0)
             self.X = np.array(self.X).reshape(-1, 1)
         else:
@@ -192,3 +633,103 @@ class rolling():
                 self.XL.append[self.X[0][0]]
                 self.X[0].pop(0)
         self.X = np.array(self.X).reshape(-1, self.multiple_X)
+
+
+class rolling_stream:
+    """
+    Rolling regression of a live feed, the window moves with every new
+    observation and only its latest state is solved, in the format of
+    rolling.result.
+    """
+
+    def __init__(self, length=40, multiple_X=1, alfa=False, labels=None,
+                 anchor=4096):
+        """
+        length [int, default=40] - observations in the window;
+        multiple_X [int, default=1] - number of factors (Xes);
+        alfa [bool, default=False] - adds the constant (alfa);
+        labels [list of str, default=None] - names of the Xes, by default
+        X (one factor) or X0, X1 ...;
+        anchor [int, default=4096] - the sums are recomputed from the
+        window every anchor updates for precision, None never.
+            self.update(Y, X) - adds observations, returns the latest result;
+            self.result - the latest result, None until the window is full.
+        Observations with nan are kept in the window but left out of the
+        sums, N_observations counts the used ones (as rolling.fit).
+        """
+        self.length = length
+        self.multiple_X = multiple_X
+        self.alfa = alfa
+        self.XL = labels or (['X'] if multiple_X == 1 else
+                             ['X'+str(x) for x in range(multiple_X)])
+        self.anchor = anchor
+        self.result = None
+        # ring buffer of the window, rows are [X, y] minus the shift
+        self._buffer = np.zeros((length, multiple_X+1))
+        self._valid = np.zeros(length, dtype=bool)
+        self._position = 0
+        self._count = 0
+        self._used = 0
+        self._updates = 0
+        self._shift = None
+        self._first = np.zeros(multiple_X+1)
+        self._second = np.zeros((multiple_X+1, multiple_X+1))
+
+    def update(self, Y, X):
+        """
+        Adds one observation or a batch of them, newest to oldest as
+        everywhere else, in O(k^2) each.
+            Y [float | list of float];
+            X [float | list of float | list of lists] - a row per observation.
+        Returns the result of the latest window, None until it is full.
+        """
+        Y = np.asarray(Y, dtype=float).reshape(-1, 1)
+        X = np.asarray(X, dtype=float).reshape(-1, self.multiple_X)
+        values = np.hstack((X, Y))[::-1]
+        for row in values:
+            valid = bool(np.isfinite(row).all())
+            if self._shift is None and valid:
+                self._shift = row if self.alfa else np.zeros(len(row))
+            # rows with nan are stored as 0, so they add nothing
+            row = row - self._shift if valid else np.zeros(len(row))
+            if self._count == self.length:
+                old = self._buffer[self._position]
+                self._first -= old
+                self._second -= np.outer(old, old)
+                self._used -= self._valid[self._position]
+            else:
+                self._count += 1
+            self._buffer[self._position] = row
+            self._valid[self._position] = valid
+            self._used += valid
+            self._first += row
+            self._second += np.outer(row, row)
+            self._position = (self._position+1) % self.length
+            self._updates += 1
+            if self.anchor and self._updates % self.anchor == 0:
+                self._reanchor()
+        if self._count == self.length:
+            self.result = self._solve()
+        return self.result
+
+    def _reanchor(self):
+        # recomputes the sums from the window
+        window = self._buffer[:self._count]
+        self._first = window.sum(axis=0)
+        self._second = window.T @ window
+
+    def _solve(self):
+        sums = np.concatenate((self._first, self._second.reshape(-1)))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            R, beta, intercept = _window_fit(
+                np.array([float(self._used)]), sums.reshape(1, -1),
+                self.multiple_X, self.alfa)
+        result = {'R_squared': R[0], 'N_observations': self._used}
+        for i, label in enumerate(self.XL):
+            result[label] = beta[0, i]
+        if self.alfa:
+            shift = self._shift if self._shift is not None else \
+                np.zeros(self.multiple_X+1)
+            result['alfa'] = intercept[0] + shift[-1] - \
+                beta[0] @ shift[:-1]
+        return result
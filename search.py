@@ -0,0 +1,360 @@
+"""
+search contains the strategies used by ARIMA.build to select a model without
+solving the whole grid of AR(t1)MA(t) models, t1 in range(1, lags) and
+t in range(2, lags). Models are ranked by R as in ARIMA.all_models.
+It also contains the subset searches of AutoReg and MovingAvg
+(best_subset and stepwise), which select n_factors lags out of many.
+"""
+import time
+import numpy as np
+from scipy.linalg import solve_triangular
+try:
+    from . import kernels
+except Exception:
+    import kernels
+
+
+class searcher:
+    def __init__(self, data, lags, models=None, seconds=None, ar_lags=None,
+                 ma_lags=None):
+        """
+        Solves the models asked by the strategies, keeps the results and
+        watches the budget.
+            data [array of float] - stationary data, newest to oldest;
+            lags [int] - the grid is range(1, lags) x range(2, lags);
+            models [int, default=None] - maximum number of solved models;
+            seconds [float, default=None] - maximum time of the search;
+            ar_lags, ma_lags [list of int, default=None] - only these lags
+            are tested (as screened by kernels.screen_lags).
+            self.results - {(t1, t): (AR, MA, R)} solved on the whole data;
+            self.evaluated - models solved, including the ones on prefixes.
+        The first chunk of models on the whole data is solved even when the
+        budget is spent, so every strategy returns a best model.
+        """
+        self.data = np.asarray(data, dtype=float).reshape(-1)
+        self.lags = lags
+        self.ar_lags = np.arange(1, lags) if ar_lags is None else \
+            np.asarray(ar_lags, dtype=int).reshape(-1)
+        self.ma_lags = np.arange(2, lags) if ma_lags is None else \
+            np.asarray(ma_lags, dtype=int).reshape(-1)
+        self._allowed_ar = set(self.ar_lags.tolist())
+        self._allowed_ma = set(self.ma_lags.tolist())
+        self.models = models
+        self.seconds = seconds
+        self.results = {}
+        self.evaluated = 0
+        self.start = time.perf_counter()
+
+    @property
+    def candidates(self):
+        return len(self.ar_lags) * len(self.ma_lags)
+
+    def _pairs(self, step=1):
+        # tested pairs in the order of the grid
+        ar_lags = self.ar_lags[::step].tolist()
+        return [(t1, t) for t in self.ma_lags[::step].tolist()
+                for t1 in ar_lags]
+
+    def exhausted(self):
+        if self.models is not None and self.evaluated >= self.models:
+            return True
+        return self.seconds is not None and \
+            time.perf_counter() - self.start >= self.seconds
+
+    def _allowed(self, count, rows=None):
+        # how many of count models could still be solved, the first chunk
+        # on the whole data is solved whatever the budget, so there is
+        # always a best model
+        first = rows is None and not self.results
+        if not first and self.seconds is not None and \
+                time.perf_counter() - self.start >= self.seconds:
+            return 0
+        if self.models is None:
+            return count
+        return max(min(count, self.models - self.evaluated), int(first))
+
+    def evaluate(self, pairs, rows=None):
+        """
+        Returns the R of every (t1, t) pair, nan for pairs left out by the
+        budget. With rows only the newest rows of data are used and the
+        results are not stored.
+        """
+        pairs = [pair for pair in pairs if pair[0] in self._allowed_ar
+                 and pair[1] in self._allowed_ma]
+        R = np.full(len(pairs), np.nan)
+        step = 64 if self.seconds is not None else len(pairs)
+        for start in range(0, len(pairs), max(step, 1)):
+            # pairs are scanned chunk by chunk, so a spent budget also
+            # stops the scan of a long list
+            chunk = range(start, min(start+step, len(pairs)))
+            if rows is None:
+                for i in chunk:
+                    if pairs[i] in self.results:
+                        R[i] = self.results[pairs[i]][2]
+                chunk = [i for i in chunk if pairs[i] not in self.results]
+            allowed = self._allowed(len(chunk), rows)
+            if chunk and not allowed:
+                break
+            chunk = chunk[:allowed]
+            if not chunk:
+                continue
+            ar_lags, ma_lags = zip(*[pairs[i] for i in chunk])
+            AR, MA, score = kernels.solve_arima_moments(
+                kernels.arima_pairs(self.data, ar_lags, ma_lags, rows))
+            self.evaluated += len(chunk)
+            for j, i in enumerate(chunk):
+                R[i] = score[j]**2
+                if rows is None:
+                    self.results[pairs[i]] = (AR[j], MA[j], R[i])
+        return pairs, R
+
+    def best(self):
+        # best solved pair
+        if not self.results:
+            return None
+        return max(self.results, key=lambda pair: np.nan_to_num(
+            self.results[pair][2], nan=-np.inf))
+
+    def _grid(self, rows=None):
+        # all models at once by kernels.arima_grid, the order of the grid
+        AR, MA, score = kernels.arima_grid(
+            self.data[:rows], self.lags, self.ma_lags, self.ar_lags)
+        self.evaluated += self.candidates
+        pairs = self._pairs()
+        R = score.T.reshape(-1)**2
+        if rows is None:
+            for pair, a, m, r in zip(
+                    pairs, AR.T.reshape(-1), MA.T.reshape(-1), R):
+                self.results[pair] = (a, m, r)
+        return pairs, R
+
+    def exhaustive(self):
+        # every model in the order of the grid, until the budget ends,
+        # a column of the grid (one MA lag) at a time
+        if self.models is None and self.seconds is None:
+            self._grid()
+            return self.best()
+        ar_lags = self.ar_lags.tolist()
+        for t in self.ma_lags.tolist():
+            if self.results and self.exhausted():
+                break
+            self.evaluate([(t1, t) for t1 in ar_lags])
+        return self.best()
+
+    def coarse_to_fine(self, step=None):
+        """
+        Solves a sparse grid, then repeatedly refines a grid with half the
+        step around the best model, until the step is 1.
+            step [int, default=None] - first step, by default lags//8.
+        """
+        step = max(step or self.lags//8, 1)
+        self.evaluate(self._pairs(step))
+        while step > 1 and self.results and not self.exhausted():
+            step = max(step//2, 1)
+            t1, t = self.best()
+            self.evaluate([(t1+i*step, t+j*step) for j in range(-2, 3)
+                           for i in range(-2, 3)])
+        return self.best()
+
+    def successive_halving(self, eta=3, min_rows=None):
+        """
+        Solves all models on the newest part of the data, keeps the best
+        1/eta of them and solves those on eta times more data,
+        until the whole data is used.
+            eta [int, default=3] - the share of models kept every round;
+            min_rows [int, default=None] - rows of the first round,
+            by default 4*lags.
+        With a models budget a round solves only as many models as leave
+        enough of it to solve the kept ones on the whole data; with a time
+        budget the rounds are solved in chunks between checks of the clock.
+        """
+        pairs = self._pairs()
+        min_rows = min_rows or 4*self.lags
+        rounds = int(np.ceil(np.log(max(len(pairs), 1))/np.log(eta)))
+        for r in range(rounds, 0, -1):
+            rows = max(len(self.data)//eta**r, min_rows)
+            if rows >= len(self.data) or len(pairs) <= 1 or \
+                    self.exhausted():
+                break
+            count = len(pairs)
+            if self.models is not None:
+                count = min(count, (self.models-self.evaluated)*eta//(eta+1))
+            # only the first round is cut to the budget, the models kept
+            # by a later round are solved on the whole data instead
+            if count <= 1 or (count < len(pairs) and r < rounds):
+                break
+            if count == self.candidates and self.seconds is None:
+                pairs, R = self._grid(rows)
+            else:
+                pairs, R = self.evaluate(pairs[:count], rows)
+            # models left out by the clock are not kept
+            solved = np.count_nonzero(~np.isnan(R))
+            if not solved:
+                break
+            keep = max(min(len(pairs)//eta, solved), 1)
+            order = np.argsort(-np.nan_to_num(R, nan=-np.inf), kind='stable')
+            pairs = [pairs[i] for i in order[:keep]]
+        self.evaluate(pairs)
+        return self.best()
+
+    def hill_climb(self, seed=None):
+        """
+        Moves from the seed model to its best neighbour (t1, t one tested
+        lag lower or higher) while the R improves.
+            seed [tuple of int, default=None] - (t1, t), by default the
+            lowest tested lags, (1, 2) without screening.
+        """
+        if not self.candidates:
+            return None
+        current = tuple(seed or (int(self.ar_lags[0]), int(self.ma_lags[0])))
+        self.evaluate([current])
+        while not self.exhausted():
+            p = np.searchsorted(self.ar_lags, current[0])
+            q = np.searchsorted(self.ma_lags, current[1])
+            self.evaluate([(int(self.ar_lags[p+i]), int(self.ma_lags[q+j]))
+                           for i in (-1, 0, 1) for j in (-1, 0, 1)
+                           if (i or j) and 0 <= p+i < len(self.ar_lags)
+                           and 0 <= q+j < len(self.ma_lags)])
+            best = self.best()
+            if best == current or best is None:
+                break
+            current = best
+        return self.best()
+
+
+strategies = {'exhaustive': searcher.exhaustive,
+              'coarse_to_fine': searcher.coarse_to_fine,
+              'successive_halving': searcher.successive_halving,
+              'hill_climb': searcher.hill_climb}
+
+
+def best_subset(y, columns, lags, k):
+    """
+    Exact branch and bound search of the k columns with the best R of the
+    regression with intercept (as kernels.subset_regressions), returns the
+    column indexes and the number of solved subsets.
+    Subsets are grouped by their largest lag, which fixes the used rows, so
+    adding columns can only lower the residuals. A branch is dropped when
+    even all of its remaining columns together can not beat the best
+    subset found, the first best subset is taken from forward stepwise.
+    Columns are branched in order of their correlation with y (on the
+    rows of the group), so good subsets are found early and more
+    branches are cut.
+    """
+    lags = np.asarray(lags, dtype=int)
+    if k < 1 or k > len(lags):
+        return None, 0
+    best, evaluated = stepwise(y, columns, lags, k)
+    _, _, score = kernels.subset_regressions(y, columns, lags, [best])
+    state = {'best': tuple(best), 'score': score[0],
+             'evaluated': evaluated+1}
+    X = kernels.lag_design(y, columns, lags)[0]
+    n, gram, rows = len(X), np.zeros((X.shape[1],)*2), 0
+    for top in range(len(lags)-1, k-2, -1):
+        new_rows = n - lags[top]
+        if new_rows > rows:
+            gram += X[rows:new_rows].T @ X[rows:new_rows]
+            rows = new_rows
+        if rows > k+1:
+            _branch(gram, rows, top, _ranked(gram, rows, top), [], 0, k,
+                    state)
+    return list(state['best']), state['evaluated']
+
+
+def _ranked(gram, rows, top):
+    # columns below top by their squared correlation with y, strongest first
+    index = np.arange(top)+2
+    cross = gram[index, 1] - gram[0, index]*gram[0, 1]/rows
+    spread = gram[index, index] - gram[0, index]**2/rows
+    with np.errstate(divide='ignore', invalid='ignore'):
+        strength = np.nan_to_num(cross**2/spread, nan=0.0)
+    return [int(j) for j in np.argsort(-strength, kind='stable')]
+
+
+def _branch(gram, rows, top, rank, chosen, start, k, state):
+    # chosen columns below top, the rest is picked from rank[start:]
+    need = k-1-len(chosen)
+    total = gram[1, 1] - gram[0, 1]**2/rows
+    if need == 0 or need == 1:
+        subsets = [sorted(chosen)+[top]] if need == 0 else \
+            [sorted(chosen+[j])+[top] for j in rank[start:]]
+        if not subsets:
+            return
+        A, b = _blocks(gram, subsets)
+        try:
+            beta = np.linalg.solve(A, b[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            beta = (np.linalg.pinv(A) @ b[..., None])[..., 0]
+        score = 1 - (gram[1, 1] - (beta*b).sum(axis=1))/total
+        state['evaluated'] += len(subsets)
+        i = int(np.argmax(np.nan_to_num(score, nan=-np.inf)))
+        if score[i] > state['score']:
+            state['score'], state['best'] = score[i], tuple(subsets[i])
+        return
+    # residuals of chosen + top + rank[p:] for every p at once,
+    # the prefixes of one Cholesky factor in the order rank[-1], rank[-2] ...
+    order = [0] + [c+2 for c in chosen] + [top+2] + \
+        [j+2 for j in reversed(rank[start:])]
+    try:
+        factor = np.linalg.cholesky(gram[np.ix_(order, order)])
+        z = solve_triangular(factor, gram[order, 1], lower=True)
+        residuals = gram[1, 1] - np.cumsum(z*z)
+    except np.linalg.LinAlgError:
+        residuals = np.zeros(len(order))
+    for p in range(start, len(rank)-need+1):
+        bound = 1 - residuals[len(chosen)+1+len(rank)-p]/total
+        if bound < state['score'] - 1e-12:
+            # smaller sets of the later branches can not do better
+            break
+        _branch(gram, rows, top, rank, chosen+[rank[p]], p+1, k, state)
+
+
+def _blocks(gram, subsets):
+    # normal equations of subsets with intercept, from the Gram matrix
+    index = np.hstack((np.zeros((len(subsets), 1), dtype=int),
+                       np.asarray(subsets, dtype=int)+2))
+    return gram[index[:, :, None], index[:, None, :]], gram[index, 1]
+
+
+def stepwise(y, columns, lags, k, direction='forward'):
+    """
+    Greedy selection of k columns, returns the column indexes (ascending)
+    and the number of solved subsets.
+        direction [str, default='forward'] - 'forward' adds the column
+        improving R the most, 'backward' starts with all columns on the rows
+        of the largest lag and removes the one costing the least.
+    """
+    lags = np.asarray(lags, dtype=int)
+    if direction == 'backward':
+        return _backward(y, columns, lags, k)
+    chosen, evaluated = [], 0
+    for _ in range(k):
+        rest = [j for j in range(len(lags)) if j not in chosen]
+        subsets = [sorted(chosen+[j]) for j in rest]
+        _, _, score = kernels.subset_regressions(y, columns, lags, subsets)
+        evaluated += len(subsets)
+        chosen = subsets[int(np.argmax(np.nan_to_num(score, nan=-np.inf)))]
+    return chosen, evaluated
+
+
+def _backward(y, columns, lags, k):
+    # removes columns by the rise of the residuals beta**2/inverse[j, j],
+    # the inverse of the normal equations is downdated after every removal
+    X = kernels.lag_design(y, columns, lags)[0][:len(y)-lags.max()]
+    keep = [0] + list(range(2, X.shape[1]))
+    gram = X.T @ X
+    inverse = np.linalg.pinv(gram[np.ix_(keep, keep)])
+    beta = inverse @ gram[keep, 1]
+    chosen, evaluated = list(range(len(lags))), 1
+    while len(chosen) > k:
+        # every removal scores the len(chosen) smaller subsets
+        evaluated += len(chosen)
+        cost = beta[1:]**2/np.diag(inverse)[1:]
+        j = int(np.argmin(cost))+1
+        inverse = np.delete(np.delete(inverse, j, 0), j, 1) - \
+            np.outer(np.delete(inverse[:, j], j), np.delete(inverse[j], j)) / \
+            inverse[j, j]
+        beta = inverse @ np.delete(gram[keep, 1], j)
+        keep.pop(j)
+        chosen.pop(j-1)
+    return chosen, evaluated
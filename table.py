@@ -0,0 +1,156 @@
+"""
+table holds the solved ARIMA models as one structured numpy array instead of
+a dict of dicts, queries as best / top / filter are vectorized.
+"""
+import re
+from collections.abc import MutableMapping
+import numpy as np
+
+
+dtype = np.dtype([('AR_lag', np.int32), ('MA_lag', np.int32),
+                  ('integrations', np.int8), ('AR', np.float64),
+                  ('MA', np.float64), ('R', np.float64)])
+
+_KEY = re.compile(r'^AR(\d+)I(\d+)MA(\d+)$')
+
+
+class model_table(MutableMapping):
+    def __init__(self, records=None, top_k=None):
+        """
+        Table of ARIMA models, it is also a dict view of them
+        (self['AR1I0MA2'] returns {'R': ..., 'AR': ..., 'MA': ...}),
+        so it replaces the former all_models dict.
+            records [structured array of table.dtype, default=None];
+            top_k [int, default=None] - keep only the top_k models by R.
+        """
+        self.top_k = top_k
+        self.records = np.empty(0, dtype=dtype)
+        self._index = None
+        if records is not None:
+            self.add(records)
+
+    @classmethod
+    def from_grid(cls, AR, MA, score, integrations, ma_lags=None,
+                  top_k=None, ar_lags=None):
+        """
+        Builds the table from the arrays of kernels.arima_grid, in the order
+        of the grid (MA lag, then AR lag); R is score squared.
+        """
+        if ar_lags is None:
+            ar_lags = np.arange(1, AR.shape[0]+1)
+        if ma_lags is None:
+            ma_lags = np.arange(2, AR.shape[1]+2)
+        records = np.empty(AR.size, dtype=dtype)
+        records['MA_lag'] = np.repeat(ma_lags, len(ar_lags))
+        records['AR_lag'] = np.tile(ar_lags, len(ma_lags))
+        records['integrations'] = integrations
+        records['AR'] = AR.T.reshape(-1)
+        records['MA'] = MA.T.reshape(-1)
+        records['R'] = score.T.reshape(-1)**2
+        return cls(records, top_k)
+
+    @staticmethod
+    def key(AR_lag, integrations, MA_lag):
+        return 'AR'+str(AR_lag)+'I'+str(integrations)+'MA'+str(MA_lag)
+
+    def add(self, records):
+        # appends records, with top_k only the best of them are kept
+        records = np.asarray(records, dtype=dtype).reshape(-1)
+        self.records = np.concatenate((self.records, records))
+        if self.top_k is not None and len(self.records) > self.top_k:
+            order = np.argsort(
+                -np.nan_to_num(self.records['R'], nan=-np.inf),
+                kind='stable')
+            self.records = self.records[np.sort(order[:self.top_k])]
+        self._index = None
+
+    def _position(self, key):
+        # row of the key, KeyError if missing
+        match = _KEY.match(key) if isinstance(key, str) else None
+        if match is None:
+            raise KeyError(key)
+        if self._index is None:
+            self._index = {(int(p), int(i), int(q)): row for row, (p, i, q)
+                           in enumerate(zip(self.records['AR_lag'],
+                                            self.records['integrations'],
+                                            self.records['MA_lag']))}
+        try:
+            return self._index[tuple(int(x) for x in match.groups())]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def _spec(self, row):
+        record = self.records[row]
+        return {'R': record['R'], 'AR': record['AR'], 'MA': record['MA']}
+
+    def __getitem__(self, key):
+        return self._spec(self._position(key))
+
+    def __setitem__(self, key, spec):
+        match = _KEY.match(key)
+        if match is None:
+            raise KeyError(key)
+        p, i, q = (int(x) for x in match.groups())
+        record = np.array([(p, q, i, spec['AR'], spec['MA'], spec['R'])],
+                          dtype=dtype)
+        try:
+            self.records[self._position(key)] = record[0]
+        except KeyError:
+            self.add(record)
+
+    def __delitem__(self, key):
+        self.records = np.delete(self.records, self._position(key))
+        self._index = None
+
+    def __iter__(self):
+        return (self.key(p, i, q) for p, i, q in zip(
+            self.records['AR_lag'], self.records['integrations'],
+            self.records['MA_lag']))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return 'model_table('+str(len(self))+' models)'
+
+    def argmax(self):
+        # row of the first model with the highest R, None if no R above 0
+        if not len(self.records):
+            return None
+        row = int(np.argmax(np.nan_to_num(self.records['R'], nan=-np.inf)))
+        return row if self.records['R'][row] > 0 else None
+
+    def best(self):
+        # best model as {key: spec}, as ARIMA.best
+        row = self.argmax()
+        if row is None:
+            return None
+        record = self.records[row]
+        return {self.key(record['AR_lag'], record['integrations'],
+                         record['MA_lag']): self._spec(row)}
+
+    def top(self, k):
+        # the k models with the highest R, best first
+        order = np.argsort(-np.nan_to_num(self.records['R'], nan=-np.inf),
+                           kind='stable')
+        return model_table(self.records[order[:k]])
+
+    def filter(self, mask=None, **bounds):
+        """
+        Returns table of the models passing mask (boolean array) and bounds,
+        a bound is a field name with a value or (low, high) inclusive range,
+        as filter(AR_lag=(1, 10), R=(0.1, None)).
+        """
+        keep = np.ones(len(self.records), dtype=bool) if mask is None \
+            else np.asarray(mask, dtype=bool)
+        for field, bound in bounds.items():
+            column = self.records[field]
+            if isinstance(bound, tuple):
+                low, high = bound
+                if low is not None:
+                    keep &= column >= low
+                if high is not None:
+                    keep &= column <= high
+            else:
+                keep &= column == bound
+        return model_table(self.records[keep])
@@ -0,0 +1,63 @@
+import warnings
+import numpy as np
+import pytest
+from statsmodels.tsa.stattools import adfuller
+from data_tests import stationarity
+
+
+def _series():
+    rng = np.random.default_rng(0)
+    t = np.arange(300.)
+    return {'noise': rng.normal(size=300),
+            'random walk': np.cumsum(rng.normal(size=300)),
+            'noisy cycle': np.sin(2*np.pi*t/12) + 0.1*rng.normal(size=300),
+            'short trend': np.arange(50.),
+            'trend': 3 + 0.5*t,
+            'cycle': np.sin(2*np.pi*t/12),
+            'square': t**2}
+
+
+def _adfuller(x):
+    # decision of stationarity.ADF taken from statsmodels adfuller
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        statistic, pvalue, lags, _, critical, _ = adfuller(x, autolag='AIC')
+    return statistic, lags, pvalue < 0.05 and critical['5%'] > statistic
+
+
+@pytest.mark.parametrize('name', list(_series()))
+def test_adf_matches_adfuller(name):
+    x = _series()[name]
+    statistic, lags, stationary = _adfuller(x)
+    result = stationarity.adf(x)
+    assert stationarity.ADF(x) == stationary
+    if name in ('noise', 'random walk', 'noisy cycle'):
+        # deterministic series fit exactly, only the decision is compared
+        assert result['lags'] == lags
+        assert abs(result['statistic'] - statistic) < 1e-8
+
+
+@pytest.mark.parametrize('name', list(_series()))
+def test_force_stat_matches_adfuller(name):
+    x = _series()[name]
+    integrations = 0
+    while not _adfuller(x)[2]:
+        x, integrations = np.diff(x), integrations+1
+    stationarity.memory.clear()
+    assert stationarity.forceSTAT(_series()[name])[0] == integrations
+
+
+def test_adf_batch_matches_rows():
+    series = _series()
+    batch = stationarity.ADF(np.array(
+        [x for x in series.values() if len(x) == 300]))
+    assert list(batch) == [stationarity.ADF(x) for x in series.values()
+                           if len(x) == 300]
+
+
+def test_adf_constant():
+    with pytest.raises(ValueError):
+        adfuller(np.ones(100))
+    with pytest.raises(ValueError):
+        stationarity.ADF(np.ones(100))
+    assert np.isnan(stationarity.adf(np.ones((2, 100)))['statistic']).all()
@@ -0,0 +1,11 @@
+import numpy as np
+from modules import fleet
+
+
+def test_fit_chunk_keeps_failures_per_series():
+    rng = np.random.default_rng(0)
+    series = [np.cumsum(rng.normal(size=300)) for _ in range(4)] + \
+        [np.arange(300.), np.ones(300)]
+    rows = fleet._fit_chunk(series, 20, 5)
+    assert all(row['key'] is not None for row in rows[:5])
+    assert rows[5]['key'] is None
@@ -0,0 +1,13 @@
+import numpy as np
+from modules import granger
+
+
+def test_matrix_constant_series():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=300)
+    y = 0.5*np.roll(x, -1) + rng.normal(size=300)
+    result = granger.matrix([x, y, np.ones(300)], workers=1)
+    assert result['integrations'] == [0, 0, None]
+    assert np.isnan(result['value'][:, 2]).all()
+    assert np.isnan(result['value'][:, :, 2]).all()
+    assert result['causes'][0, 0, 1]
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+import predict
+
+
+def _ar(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    e, y = rng.normal(size=n), np.zeros(n)
+    for t in range(n-1, -1, -1):
+        y[t] = e[t] + (0.4*y[t+3] if t+3 < n else 0.) - \
+            (0.3*y[t+7] if t+7 < n else 0.)
+    return y
+
+
+@pytest.mark.parametrize('model', [predict.AutoReg, predict.MovingAvg])
+@pytest.mark.parametrize('n_factors', [1, 2, 3])
+def test_branch_and_bound_matches_exhaustive(model, n_factors):
+    best = []
+    for strategy in ('exhaustive', 'branch_and_bound'):
+        lagged = model(_ar(), lags=12, n_factors=n_factors)
+        result = lagged.build(strategy=strategy)
+        best.append(next(iter(result.values()))['R'])
+    assert abs(best[0] - best[1]) < 1e-10
+
+
+def test_simple_lag_unknown_strategy():
+    with pytest.raises(ValueError):
+        predict.AutoReg(_ar(), lags=12).build(strategy='typo')
@@ -0,0 +1,30 @@
+import numpy as np
+import predict
+from registry import registry
+
+
+def test_registry_measures_new_instances():
+    models = predict.LinearProjection.current_models
+    try:
+        predict.LinearProjection.current_models = registry(
+            max_bytes=10000, weak=False)
+        kept = predict.LinearProjection.current_models
+        for _ in range(5):
+            predict.LinearProjection(np.arange(200000.))
+        assert len(kept) == 1
+        assert kept.memory() >= 1600000
+        kept[0].build()
+        assert kept.memory() >= 1600000
+    finally:
+        predict.LinearProjection.current_models = models
+
+
+def test_registry_counts_unbuilt_arima():
+    models = predict.ARIMA.current_models
+    try:
+        predict.ARIMA.current_models = registry(weak=False)
+        data = np.random.default_rng(0).normal(size=1000)
+        predict.ARIMA(data, lags=10)
+        assert predict.ARIMA.current_models.memory() >= data.nbytes
+    finally:
+        predict.ARIMA.current_models = models
@@ -0,0 +1,166 @@
+import numpy as np
+import regression
+
+
+def _data(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    y = 0.5*np.roll(x, -1) + rng.normal(size=n)
+    return y, x
+
+
+def test_causality_fit_defaults():
+    # (n, 1) columns of fix_data are tested as single series
+    y, x = _data()
+    model = regression.causality(list(y), list(x))
+    model.fit()
+    assert model.integrations == 0
+    assert model.result['lags'] == [1, 2, 3, 4, 5]
+    assert model.result['X => Y'][0]
+
+
+def test_causality_fit_defaults_integrated():
+    y, x = _data()
+    model = regression.causality(list(np.cumsum(y[::-1])[::-1]),
+                                 list(np.cumsum(x[::-1])[::-1]))
+    model.fit()
+    assert model.integrations == 1
+    assert model.Y.shape == (299, 1)
+
+
+def test_causality_fit_rolling_defaults():
+    y, x = _data()
+    result = regression.causality(list(y), list(x)).fit_rolling()
+    assert result['value'].shape == (51, 5)
+
+
+def test_linear_regression_integrate():
+    y, x = _data()
+    model, integrations = regression.linear_regression(y, x, integrate=True)
+    assert integrations == 0
+    assert model.params.shape == (1,)
+
+
+def _rolling(Y, X, backend, **fit):
+    model = regression.rolling(list(Y), list(X))
+    model.fit(backend=backend, **fit)
+    return model.result
+
+
+def _causality(Y, X, backend, rolling=False, **fit):
+    model = regression.causality(list(Y), list(X))
+    if rolling:
+        return model.fit_rolling(integrate=False, backend=backend, **fit)
+    model.fit(integrate=False, backend=backend, **fit)
+    return model.result
+
+
+def _compare(numpy, reference, tol=1e-8):
+    # same keys, values within tol and nan at the same places
+    if isinstance(reference, dict):
+        assert numpy.keys() == reference.keys()
+        for key in reference:
+            _compare(numpy[key], reference[key], tol)
+        return
+    numpy = np.asarray(numpy, dtype=float)
+    reference = np.asarray(reference, dtype=float)
+    assert numpy.shape == reference.shape
+    assert (np.isnan(numpy) == np.isnan(reference)).all()
+    assert np.nanmax(np.abs(numpy - reference), initial=0.) <= tol
+
+
+def _backends(solve, *args, **fit):
+    _compare(*(solve(*args, backend=name, **fit)
+               for name in regression._BACKENDS))
+
+
+def test_backends_rolling():
+    y, x = _data()
+    _backends(_rolling, y, x, length=40, alfa=True, integrate=False)
+    _backends(_rolling, y, x, length=40, alfa=False, integrate=False)
+
+
+def test_backends_rolling_lengths():
+    y, x = _data()
+    _backends(_rolling, y, x, length=[20, 40, 80], alfa=True,
+              integrate=False)
+
+
+def test_backends_rolling_expanding():
+    y, x = _data()
+    _backends(_rolling, y, x, length=[30, 60], alfa=True, expanding=True,
+              integrate=False)
+
+
+def test_backends_rolling_anchor():
+    y, x = _data()
+    _backends(_rolling, y, x, length=40, alfa=True, anchor=64,
+              integrate=False)
+
+
+def test_backends_causality():
+    y, x = _data()
+    _backends(_causality, y, x, test_lags=5)
+
+
+def test_backends_causality_rolling():
+    y, x = _data()
+    _backends(_causality, y, x, rolling=True, length=60, test_lags=4)
+
+
+def test_backends_causality_nan():
+    y, x = _data()
+    y[[7, 150]], x[90] = np.nan, np.nan
+    _backends(_causality, y, x, test_lags=5)
+    _backends(_causality, y, x, rolling=True, length=60, test_lags=4)
+
+
+def test_backends_rolling_nan():
+    y, x = _data()
+    y[[7, 150]], x[90] = np.nan, np.nan
+    _backends(_rolling, y, x, length=[40, 80], alfa=True, expanding=True,
+              integrate=False)
+    result = _rolling(y, x, 'numpy', length=40, integrate=False)
+    assert result['N_observations'][0] == 39
+    assert result['N_observations'][-1] == 40
+
+
+def _batch_reference(Y, X):
+    # statsmodels OLS with missing='drop' of every column of Y
+    from statsmodels.regression.linear_model import OLS
+    from statsmodels.tools import add_constant
+    return [OLS(Y[:, j], add_constant(X), missing='drop').fit()
+            for j in range(Y.shape[1])]
+
+
+def test_batch_ols_ill_conditioned():
+    rng = np.random.default_rng(0)
+    n = 300
+    price = 100 + np.cumsum(rng.normal(size=n))
+    t = np.arange(n, dtype=float)
+    for X in (np.column_stack((price, price + 1e-3*rng.normal(size=n))),
+              np.column_stack((t, t**2, t**3)),
+              np.column_stack((price, 2*price))):
+        Y = price[:, None] + rng.normal(size=(n, 4))
+        Y[5, 1], Y[9:12, 2] = np.nan, np.nan
+        result = regression.linear_regression(
+            Y, X, multiple_X=X.shape[1], alfa=True)
+        for j, model in enumerate(_batch_reference(Y, X)):
+            assert np.allclose(result['params'][j], model.params,
+                               rtol=1e-6, atol=1e-9)
+            assert np.allclose(result['bse'][j], model.bse, rtol=1e-6)
+            assert result['df_resid'][j] == model.df_resid
+            assert abs(result['rsquared'][j] - model.rsquared) < 1e-9
+
+
+def test_rolling_stream_nan():
+    y, x = _data()
+    y[[7, 60]], x[30] = np.nan, np.nan
+    expected = _rolling(y, x, 'numpy', length=20, alfa=True,
+                        integrate=False)
+    stream = regression.rolling_stream(length=20, alfa=True)
+    for p in range(len(y)-1, -1, -1):
+        result = stream.update(y[p], x[p])
+        if p <= len(y)-20:
+            for key in result:
+                assert np.isclose(result[key], expected[key][p])